@@ -0,0 +1,167 @@
+"""
+Module with asyncio versions of the circuit drivers, for running simulations
+inside an event loop, e.g. behind a job service.
+
+The evolution and the measurements run on an executor thread, and the
+results are streamed to the event loop one measurement at a time. Closing
+the stream, or cancelling the task consuming it, stops the thread at the
+next timestep.
+
+The random gates are drawn from the global NumPy generator. So that jobs
+running concurrently on different threads do not interleave their draws,
+each job keeps its own generator state and swaps it in, under a lock, for
+each timestep. A job with a given seed therefore gives the same results as
+the blocking driver with that seed.
+"""
+
+import asyncio
+import os
+import threading
+
+import numpy as np
+import stim
+
+from supercliffords.context import MeasurementContext
+from supercliffords.entropy import compute_entropy
+from supercliffords.otoc import compute_otoc
+
+# Held while a job has its random state swapped into the global generator.
+_RNG_LOCK = threading.Lock()
+
+_DONE = object()
+
+
+def _realisations(circuit, t, res, rep, seed, cancel):
+    """
+    Evolve rep realisations of a circuit like Circuit.realisations, with a
+    random state of their own, stopping early when cancel is set.
+    """
+    if seed is None:
+        seed = int.from_bytes(os.urandom(4), "big")
+    state = np.random.RandomState(seed).get_state()
+    for r in range(rep):
+        s = stim.TableauSimulator()
+        for stepcount in range(0, t):
+            if cancel.is_set():
+                return
+            with _RNG_LOCK:
+                saved = np.random.get_state()
+                np.random.set_state(state)
+                try:
+                    s = circuit.steps.apply(s, stepcount)
+                finally:
+                    state = np.random.get_state()
+                    np.random.set_state(saved)
+            if stepcount % res == 0:
+                yield r, stepcount, s
+
+
+async def iterate_measurements(
+    circuit, t, res, rep, measure, seed=None, executor=None
+):
+    """
+    - Purpose: Evolve realisations of a circuit on an executor thread and
+      stream their measurements.
+    - Inputs:
+        - circuit (supercliffords.circuits.Circuit): the circuit.
+        - t (int): number of timesteps.
+        - res (int): resolution (i.e. how often to measure).
+        - rep (int): number of realisations.
+        - measure (callable): measure(s, ctx) returning the value of the
+          observable, with ctx a MeasurementContext owned by the job.
+        - seed (int or None): seed of the random gates. Defaults to a
+          random seed.
+        - executor (concurrent.futures.Executor or None): executor to run
+          on, the default executor of the loop if None.
+    - Outputs:
+        - async iterator of (realisation, stepcount, value) tuples, in the
+          order they are measured.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancel = threading.Event()
+
+    def produce():
+        try:
+            ctx = MeasurementContext(circuit.N)
+            for r, stepcount, s in _realisations(
+                circuit, t, res, rep, seed, cancel
+            ):
+                item = (r, stepcount, measure(s, ctx))
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    future = loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        cancel.set()
+        await asyncio.shield(future)
+
+
+async def _average(circuit, t, res, rep, measure, seed, executor):
+    """
+    Average the streamed measurements over the realisations.
+    """
+    ts = np.zeros(t // res)
+    values = np.zeros(t // res)
+    for i in range(t // res):
+        ts[i] = i * res
+    async for _, stepcount, value in iterate_measurements(
+        circuit, t, res, rep, measure, seed, executor
+    ):
+        values[stepcount // res] += value / rep
+    return values, ts
+
+
+async def compute_entropy_async(
+    circuit, t, cut, res, rep, seed=None, executor=None
+):
+    """
+    - Purpose: asyncio version of Circuit.compute_entropy.
+    - Inputs:
+        - circuit (supercliffords.circuits.Circuit): the circuit.
+        - t, cut, res, rep, seed: see Circuit.compute_entropy.
+        - executor (concurrent.futures.Executor or None): see
+          iterate_measurements.
+    - Outputs:
+        - S (np.array): Operator entanglement.
+        - ts (np.array): Timesteps at which the operator entanglement was
+          computed.
+    """
+
+    def measure(s, ctx):
+        return compute_entropy(s, cut, ctx)
+
+    return await _average(circuit, t, res, rep, measure, seed, executor)
+
+
+async def compute_otoc_async(
+    circuit, t, res, rep, op, seed=None, executor=None
+):
+    """
+    - Purpose: asyncio version of Circuit.compute_otoc.
+    - Inputs:
+        - circuit (supercliffords.circuits.Circuit): the circuit.
+        - t, res, rep, seed: see Circuit.compute_otoc.
+        - op (stim.Tableau): The perturbation operator V0.
+        - executor (concurrent.futures.Executor or None): see
+          iterate_measurements.
+    - Outputs:
+        - f (np.array): Out-of-time-ordered correlator.
+        - ts (np.array): Timesteps at which the otoc was computed.
+    """
+
+    def measure(s, ctx):
+        return compute_otoc(s, circuit.N, op, ctx)
+
+    return await _average(circuit, t, res, rep, measure, seed, executor)
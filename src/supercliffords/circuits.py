@@ -10,9 +10,15 @@ from supercliffords.steps import (
     AlternatingEven,
     AlternatingOdd,
     StepSequence,
+    FloquetStep,
 )
 from supercliffords.entropy import compute_entropy
 from supercliffords.otoc import compute_otoc
+from supercliffords.context import MeasurementContext
+from supercliffords.pipeline import MeasurementPipeline
+from supercliffords.snapshots import Snapshot
+from supercliffords.optimize import FusingSimulator
+from supercliffords import aio
 from multiprocessing import Pool
 
 
@@ -24,6 +30,11 @@ class Circuit:
         steps (supercliffords.StepSequence): The steps of the circuit.
     """
 
+    # Evolve through a FusingSimulator, which fuses the single-qubit
+    # Cliffords of successive gates and steps and drops the I padding ops,
+    # see supercliffords.optimize. Set on an instance to enable.
+    optimize = False
+
     def __init__(self, N, steps):
         """
         Initialize the circuit.
@@ -31,7 +42,55 @@ class Circuit:
         self.N = N
         self.steps = steps
 
-    def compute_entropy(self, t, cut, res, rep):
+    def realisations(
+        self, t, res, rep, snapshots=None, save_at=(), resume=False
+    ):
+        """
+        Evolve independent realisations of the circuit.
+        params:
+            t (int): number of timesteps.
+            res (int): resolution (i.e. how often a measurement is due).
+            rep (int): number of realisations.
+            snapshots (supercliffords.snapshots.SnapshotLibrary or None):
+              library to save snapshots to and resume them from.
+            save_at (iterable of int): timesteps after which to save a
+              snapshot of each realisation.
+            resume (bool): start each realisation from its latest snapshot
+              taken before t, if there is one, instead of from scratch.
+        returns:
+            generator of (realisation, stepcount, s) tuples, one for each
+            timestep at which a measurement is due.
+        """
+        save_at = set(save_at)
+        for r in range(rep):
+            s = stim.TableauSimulator()
+            start = 0
+            if resume and snapshots is not None:
+                snapshot = snapshots.latest(r, before=t)
+                if snapshot is not None:
+                    s = snapshot.restore()
+                    start = snapshot.stepcount + 1
+            if self.optimize:
+                s = FusingSimulator(s, self.N)
+            for stepcount in range(start, t):
+                s = self.steps.apply(s, stepcount)
+                if stepcount % res == 0:
+                    yield r, stepcount, s
+                if snapshots is not None and stepcount in save_at:
+                    snapshots.save(r, Snapshot.capture(s, stepcount))
+
+    def compute_entropy(
+        self,
+        t,
+        cut,
+        res,
+        rep,
+        ctx=None,
+        snapshots=None,
+        save_at=(),
+        resume=False,
+        seed=None,
+    ):
         """
         Compute the entropy of the circuit.
         params:
@@ -41,25 +100,148 @@ class Circuit:
             entanglement).
             rep (int): number of times to repeat the simulation and
             average over.
+            ctx (supercliffords.context.MeasurementContext or None): work
+            buffers for the measurements, e.g. an OutOfCoreContext for very
+            large N. Defaults to an in-memory context.
+            snapshots, save_at, resume: save snapshots of the realisations,
+            or extend them from earlier snapshots, see Circuit.realisations.
+            When resuming, each timestep is averaged over the realisations
+            measured at it, and is NaN if there are none.
+            seed (int or None): seed of the NumPy random generator. Defaults
+            to a random seed.
         returns:
             S (np.array): Operator entanglement.
             ts (np.array): Timesteps at which the operator entanglement was
             computed.
         """
-        np.random.seed(int.from_bytes(os.urandom(4), "big"))
+        _seed(seed)
         ts = np.zeros(t // res)
         S = np.zeros(t // res)
+        counts = np.zeros(t // res)
         for i in range(t // res):
             ts[i] = i * res
-        for _ in range(rep):
-            s = stim.TableauSimulator()
-            for stepcount in range(0, t):
-                s = self.steps.apply(s, stepcount)
-                if stepcount % res == 0:
-                    S[stepcount // res] += compute_entropy(s, cut) / rep
-        return S, ts
+        if ctx is None:
+            ctx = MeasurementContext(self.N)
+        for _, stepcount, s in self.realisations(
+            t, res, rep, snapshots, save_at, resume
+        ):
+            S[stepcount // res] += compute_entropy(s, cut, ctx)
+            counts[stepcount // res] += 1
+        return _average(S, counts), ts
+
+    def compute_entropy_subsampled(self, t, cut, res, rep, subsets, ctx=None):
+        """
+        Compute the entropy of the circuit, averaged in each realisation
+        over the cuts of several random regions of cut qubits.
+        params:
+            t (int): number of timesteps.
+            cut (int): The number of qubits in each region.
+            res (int): resolution (i.e. how often to compute the operator
+            entanglement).
+            rep (int): number of times to repeat the simulation and
+            average over.
+            subsets (int): number of regions per measurement.
+            ctx (supercliffords.context.MeasurementContext or None): work
+            buffers for the measurements. Defaults to an in-memory context.
+        returns:
+            S (np.array): Operator entanglement.
+            S_var (np.array): Variance over the realisations of the region
+            averaged operator entanglement, so that the standard error of S
+            is sqrt(S_var / rep).
+            ts (np.array): Timesteps at which the operator entanglement was
+            computed.
+        """
+        _seed(None)
+        rng = np.random.default_rng()
+        ts = np.zeros(t // res)
+        values = np.zeros((rep, t // res))
+        for i in range(t // res):
+            ts[i] = i * res
+        if ctx is None:
+            ctx = MeasurementContext(self.N)
+        for r, stepcount, s in self.realisations(t, res, rep):
+            mean, _ = compute_entropy(s, cut, ctx, subsets, rng)
+            values[r, stepcount // res] = mean
+        S_var = values.var(axis=0, ddof=1) if rep > 1 else np.zeros(t // res)
+        return values.mean(axis=0), S_var, ts
+
+    def compute_observable(self, t, res, rep, observable, ctx=None):
+        """
+        Compute the average of an arbitrary observable of the circuit.
+        params:
+            t (int): number of timesteps.
+            res (int): resolution (i.e. how often to compute the
+            observable).
+            rep (int): number of times to repeat the simulation and
+            average over.
+            observable (callable): observable(s, ctx) returning a number or
+            an array, e.g. a function of
+            supercliffords.entropy.compute_information.
+            ctx (supercliffords.context.MeasurementContext or None): work
+            buffers passed to the observable. Defaults to an in-memory
+            context.
+        returns:
+            values (np.array): The observable, of shape
+            (t // res,) + np.shape(value).
+            ts (np.array): Timesteps at which the observable was computed.
+        """
+        _seed(None)
+        ts = np.zeros(t // res)
+        for i in range(t // res):
+            ts[i] = i * res
+        if ctx is None:
+            ctx = MeasurementContext(self.N)
+        values = None
+        for _, stepcount, s in self.realisations(t, res, rep):
+            value = np.asarray(observable(s, ctx), dtype=np.float64)
+            if values is None:
+                values = np.zeros((t // res,) + value.shape)
+            values[stepcount // res] += value / rep
+        if values is None:
+            values = np.zeros(t // res)
+        return values, ts
 
-    def compute_entropy_parallel(self, t, cut, res, rep, n_jobs):
+    async def compute_entropy_async(
+        self, t, cut, res, rep, seed=None, executor=None
+    ):
+        """
+        asyncio version of compute_entropy, running on an executor thread.
+        See supercliffords.aio.iterate_measurements to stream the results
+        of each realisation instead.
+        params:
+            t, cut, res, rep, seed: see Circuit.compute_entropy.
+            executor (concurrent.futures.Executor or None): executor to run
+            on, the default executor of the event loop if None.
+        returns:
+            S (np.array): Operator entanglement.
+            ts (np.array): Timesteps at which the operator entanglement was
+            computed.
+        """
+        return await aio.compute_entropy_async(
+            self, t, cut, res, rep, seed, executor
+        )
+
+    async def compute_otoc_async(
+        self, t, res, rep, op, seed=None, executor=None
+    ):
+        """
+        asyncio version of compute_otoc, running on an executor thread.
+        params:
+            t, res, rep, op, seed: see Circuit.compute_otoc.
+            executor (concurrent.futures.Executor or None): executor to run
+              on, the default executor of the event loop if None.
+        returns:
+            f (np.array): Out-of-time-ordered correlator.
+            ts (np.array): Timesteps at which the otoc was
+            computed.
+        """
+        return await aio.compute_otoc_async(
+            self, t, res, rep, _operator_tableau(op), seed, executor
+        )
+
+    def compute_entropy_parallel(
+        self, t, cut, res, rep, n_jobs, executor=None
+    ):
         """
         Distribute the calculation of entropy over multiple cores.
 
@@ -71,6 +253,9 @@ class Circuit:
             rep (int): number of times to repeat the simulation and average
               over.
             n_jobs (int): number of cores to use.
+            executor (supercliffords.executor.CircuitExecutor or None): pool
+              of workers to run on, reused across calls. If None, a new pool
+              is started for this call.
         returns:
             S (np.array): Operator entanglement.
             ts (np.array): Timesteps at which the operator entanglement was
@@ -84,13 +269,71 @@ class Circuit:
             ts[i] = i * res
         reps_per_job = rep // n_jobs
         args = [(t, cut, res, reps_per_job) for _ in range(n_jobs)]
-        with Pool(n_jobs) as p:
-            results = p.starmap(self.compute_entropy, args)
-            for result in results:
-                S += result[0] / n_jobs
+        results = self._starmap("compute_entropy", args, n_jobs, executor)
+        for result in results:
+            S += result[0] / n_jobs
         return S, ts
 
-    def compute_otoc(self, t, res, rep, op):
+    def compute_entropy_pipelined(
+        self, t, cut, res, rep, n_threads=2, max_pending=None
+    ):
+        """
+        Compute the entropy of the circuit, measuring snapshots of the
+        tableau on a pool of threads while the circuit keeps evolving.
+        params:
+            t (int): number of timesteps.
+            cut (int): The cut across which to compute the entropy.
+            res (int): resolution (i.e. how often to compute the operator
+            entanglement).
+            rep (int): number of times to repeat the simulation and
+            average over.
+            n_threads (int): number of measurement threads.
+            max_pending (int or None): maximum number of snapshots held at
+              once, see supercliffords.pipeline.MeasurementPipeline.
+        returns:
+            S (np.array): Operator entanglement.
+            ts (np.array): Timesteps at which the operator entanglement was
+            computed.
+        """
+
+        def measure(snapshot, ctx):
+            return compute_entropy(snapshot, cut, ctx)
+
+        return self._run_pipelined(
+            t, res, rep, measure, n_threads, max_pending
+        )
+
+    def _run_pipelined(self, t, res, rep, measure, n_threads, max_pending):
+        """
+        Evolve the circuit rep times, measuring every res steps through a
+        MeasurementPipeline, and average the results.
+        """
+        _seed(None)
+        ts = np.zeros(t // res)
+        values = np.zeros(t // res)
+        for i in range(t // res):
+            ts[i] = i * res
+        with MeasurementPipeline(
+            measure, self.N, n_threads, max_pending
+        ) as pipeline:
+            for _, stepcount, s in self.realisations(t, res, rep):
+                pipeline.submit(stepcount // res, s)
+            for i, value in pipeline.results():
+                values[i] += value / rep
+        return values, ts
+
+    def compute_otoc(
+        self,
+        t,
+        res,
+        rep,
+        op,
+        ctx=None,
+        snapshots=None,
+        save_at=(),
+        resume=False,
+        seed=None,
+    ):
         """
         Compute the out-of-time-ordered correlator of the circuit.
         params:
@@ -100,33 +343,137 @@ class Circuit:
             rep (int): number of times to repeat the simulation and average
               over.
             op (stim.TableauSimulator): The perturbation operator V0.
+            ctx (supercliffords.context.MeasurementContext or None): work
+              buffers for the measurements. Defaults to an in-memory context.
+            snapshots, save_at, resume: save snapshots of the realisations,
+              or extend them from earlier snapshots, see
+              Circuit.compute_entropy.
+            seed (int or None): seed of the NumPy random generator. Defaults
+              to a random seed.
         returns:
             f (np.array): Out-of-time-ordered correlator.
             ts (np.array): Timesteps at which the otoc was
             computed.
         """
-        np.random.seed(int.from_bytes(os.urandom(4), "big"))
-        if isinstance(op, stim.TableauSimulator):
-            op = op.current_inverse_tableau() ** -1
-        elif not isinstance(op, stim.Tableau):
-            raise ValueError(
-                "op must be a stim.TableauSimulator or stim.Tableau"
-            )
+        _seed(seed)
+        op = _operator_tableau(op)
 
         ts = np.zeros(t // res)
         f = np.zeros(t // res)
         for i in range(t // res):
             ts[i] = i * res
 
-        for _ in range(rep):
-            s = stim.TableauSimulator()
-            for stepcount in range(0, t):
-                s = self.steps.apply(s, stepcount)
-                if stepcount % res == 0:
-                    f[stepcount // res] += compute_otoc(s, self.N, op) / rep
+        counts = np.zeros(t // res)
+        if ctx is None:
+            ctx = MeasurementContext(self.N)
+        for _, stepcount, s in self.realisations(
+            t, res, rep, snapshots, save_at, resume
+        ):
+            f[stepcount // res] += compute_otoc(s, self.N, op, ctx)
+            counts[stepcount // res] += 1
+        return _average(f, counts), ts
+
+    def compute_otoc_pipelined(
+        self, t, res, rep, op, n_threads=2, max_pending=None
+    ):
+        """
+        Compute the out-of-time-ordered correlator of the circuit, measuring
+        snapshots of the tableau on a pool of threads while the circuit
+        keeps evolving.
+        params:
+            t (int): number of timesteps.
+            res (int): resolution (i.e. how often to compute the otoc).
+            rep (int): number of times to repeat the simulation and average
+              over.
+            op (stim.TableauSimulator or stim.Tableau): The perturbation
+              operator V0.
+            n_threads (int): number of measurement threads.
+            max_pending (int or None): maximum number of snapshots held at
+              once, see supercliffords.pipeline.MeasurementPipeline.
+        returns:
+            f (np.array): Out-of-time-ordered correlator.
+            ts (np.array): Timesteps at which the otoc was
+            computed.
+        """
+        op = _operator_tableau(op)
+
+        def measure(snapshot, ctx):
+            return compute_otoc(snapshot, self.N, op, ctx)
+
+        return self._run_pipelined(
+            t, res, rep, measure, n_threads, max_pending
+        )
+
+    def op_string_branches(self, s, op_strings):
+        """
+        Derive, from an evolution of the circuit, the evolutions it would
+        have had with other Initialize op_strings and the same random
+        gates. Initialize applies a Pauli operator P at step 0, so the
+        evolution U P is obtained from U by applying U P U^dagger at the
+        end, a cheap Pauli update.
+        params:
+            s (stim.TableauSimulator): an evolution of the circuit.
+            op_strings (list of str): op_strings of length N, containing
+              only "X" and "Y".
+        returns:
+            branches (list of stim.TableauSimulator): one evolution per
+            op_string.
+        """
+        initialize = [
+            step for step in self.steps.steps if isinstance(step, Initialize)
+        ]
+        if not initialize:
+            raise ValueError("circuit has no Initialize step")
+        base = initialize[0].frame()
+        forward = s.current_inverse_tableau().inverse()
+        branches = []
+        for op_string in op_strings:
+            frame = Initialize(self.N, op_string).frame() * base
+            branch = s.copy()
+            branch.do(forward(frame))
+            branches.append(branch)
+        return branches
+
+    def compute_otoc_op_strings(self, t, res, rep, op, op_strings, ctx=None):
+        """
+        Compute the out-of-time-ordered correlator of the circuit for
+        several Initialize op_strings, sharing one evolution of the random
+        gates per realisation between all of them. The op_strings only
+        change the signs of the evolved generators, so the entropy is the
+        same for every op_string and is given by Circuit.compute_entropy.
+        params:
+            t (int): number of timesteps.
+            res (int): resolution (i.e. how often to compute the otoc).
+            rep (int): number of times to repeat the simulation and average
+              over.
+            op (stim.TableauSimulator or stim.Tableau): The perturbation
+              operator V0.
+            op_strings (list of str): op_strings of length N, containing
+              only "X" and "Y".
+            ctx (supercliffords.context.MeasurementContext or None): work
+              buffers for the measurements. Defaults to an in-memory context.
+        returns:
+            f (np.array): Out-of-time-ordered correlators, of shape
+            (len(op_strings), t // res).
+            ts (np.array): Timesteps at which the otoc was
+            computed.
+        """
+        _seed(None)
+        op = _operator_tableau(op)
+        ts = np.zeros(t // res)
+        f = np.zeros((len(op_strings), t // res))
+        for i in range(t // res):
+            ts[i] = i * res
+        if ctx is None:
+            ctx = MeasurementContext(self.N)
+        for _, stepcount, s in self.realisations(t, res, rep):
+            for k, branch in enumerate(self.op_string_branches(s, op_strings)):
+                f[k, stepcount // res] += (
+                    compute_otoc(branch, self.N, op, ctx) / rep
+                )
         return f, ts
 
-    def compute_otoc_parallel(self, t, res, rep, op, n_jobs):
+    def compute_otoc_parallel(self, t, res, rep, op, n_jobs, executor=None):
         """
         Distribute the calculation of the out-of-time-ordered correlator over
         multiple cores.
@@ -139,6 +486,9 @@ class Circuit:
             over.
             op (stim.TableauSimulator): The perturbation operator V0.
             n_jobs (int): number of cores to use.
+            executor (supercliffords.executor.CircuitExecutor or None): pool
+              of workers to run on, reused across calls. If None, a new pool
+              is started for this call.
 
         returns:
             f (np.array): Out-of-time-ordered correlator.
@@ -155,12 +505,52 @@ class Circuit:
 
         op_tableau: stim.Tableau = op.current_inverse_tableau() ** -1
         args = [(t, res, reps_per_job, op_tableau) for _ in range(n_jobs)]
-        with Pool(n_jobs) as p:
-            results = p.starmap(self.compute_otoc, args)
-            for result in results:
-                f += result[0] / n_jobs
+        results = self._starmap("compute_otoc", args, n_jobs, executor)
+        for result in results:
+            f += result[0] / n_jobs
         return f, ts
 
+    def _starmap(self, method, args, n_jobs, executor):
+        """
+        Call a method of the circuit once for each tuple of arguments, on
+        the executor if one is given and on a new pool otherwise.
+        """
+        if executor is not None:
+            return executor.starmap(self, method, args)
+        with Pool(n_jobs) as p:
+            return p.starmap(getattr(self, method), args)
+
+
+def _seed(seed):
+    """
+    Seed the global NumPy random generator, which draws the random gates,
+    with seed, or with a random seed if it is None.
+    """
+    if seed is None:
+        seed = int.from_bytes(os.urandom(4), "big")
+    np.random.seed(seed)
+
+
+def _operator_tableau(op):
+    """
+    Return the tableau of a perturbation operator given as a simulator or
+    a tableau.
+    """
+    if isinstance(op, stim.TableauSimulator):
+        return op.current_inverse_tableau() ** -1
+    if not isinstance(op, stim.Tableau):
+        raise ValueError("op must be a stim.TableauSimulator or stim.Tableau")
+    return op
+
+
+def _average(totals, counts):
+    """
+    Divide the totals of each timestep by the number of realisations that
+    contributed to it, giving NaN where there were none.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, totals / counts, np.nan)
+
 
 class ThreeQuarterCircuit(Circuit):
     """
@@ -210,3 +600,86 @@ class AlternatingCircuit(Circuit):
             ],
         )
         super().__init__(N, steps)
+
+
+class FloquetCircuit(Circuit):
+    """
+    A circuit whose random layers are drawn once per realisation and then
+    repeated with a fixed period, e.g. a Floquet version of
+    ThreeQuarterCircuit. The state at any time is reached by raising the
+    unitary of a period to a power, see compute_entropy_at.
+
+    params:
+        circuit (Circuit): The circuit whose layers are frozen.
+        period (int): The number of steps in a period.
+    """
+
+    def __init__(self, circuit, period=1):
+        """
+        Initialize the circuit.
+        """
+        self.floquet = FloquetStep(circuit.N, circuit.steps, period)
+        steps = StepSequence(circuit.N, [self.floquet])
+        super().__init__(circuit.N, steps)
+
+    def _at(self, times, rep, seed, measure):
+        """
+        Measure each realisation at the given times, jumping to each time
+        with FloquetStep.evolution.
+        """
+        _seed(seed)
+        times = np.asarray(times, dtype=np.int64)
+        values = np.zeros(len(times))
+        for _ in range(rep):
+            self.floquet.draw()
+            for i, t in enumerate(times):
+                inverse = self.floquet.evolution(int(t)).inverse()
+                values[i] += measure(inverse) / rep
+        return values, times
+
+    def compute_entropy_at(self, times, cut, rep, ctx=None, seed=None):
+        """
+        Compute the entropy of the circuit at arbitrary (e.g. late or log
+        spaced) times, in O(log t) tableau compositions per time instead of
+        t layers.
+        params:
+            times (iterable of int): step counts to measure after, as the ts
+            returned by compute_entropy.
+            cut (int): The cut across which to compute the entropy.
+            rep (int): number of realisations to average over.
+            ctx (supercliffords.context.MeasurementContext or None): work
+            buffers for the measurements. Defaults to an in-memory context.
+            seed (int or None): seed of the NumPy random generator. With the
+            same seed, compute_entropy gives the same values at its ts.
+        returns:
+            S (np.array): Operator entanglement.
+            ts (np.array): The times.
+        """
+        if ctx is None:
+            ctx = MeasurementContext(self.N)
+        return self._at(
+            times, rep, seed, lambda s: compute_entropy(s, cut, ctx)
+        )
+
+    def compute_otoc_at(self, times, rep, op, ctx=None, seed=None):
+        """
+        Compute the out-of-time-ordered correlator of the circuit at
+        arbitrary times, see compute_entropy_at.
+        params:
+            times (iterable of int): step counts to measure after.
+            rep (int): number of realisations to average over.
+            op (stim.TableauSimulator or stim.Tableau): The perturbation
+            operator V0.
+            ctx (supercliffords.context.MeasurementContext or None): work
+            buffers for the measurements. Defaults to an in-memory context.
+            seed (int or None): seed of the NumPy random generator.
+        returns:
+            f (np.array): Out-of-time-ordered correlator.
+            ts (np.array): The times.
+        """
+        op = _operator_tableau(op)
+        if ctx is None:
+            ctx = MeasurementContext(self.N)
+        return self._at(
+            times, rep, seed, lambda s: compute_otoc(s, self.N, op, ctx)
+        )
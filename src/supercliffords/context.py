@@ -0,0 +1,246 @@
+"""
+Module defining the measurement context, which owns the work buffers used to
+compute entropies and OTOCs.
+
+Without a context, every sample converts the tableau into several dense
+float64 (N, 2N) matrices. A MeasurementContext instead keeps bit packed
+uint8 buffers sized for N, which are reused across samples and realisations.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import stim
+
+from supercliffords.gf2 import mask_tail, pack_bits, packed_width
+
+
+def inverse_tableau(s):
+    """
+    - Purpose: Return the inverse tableau of a circuit.
+    - Inputs:
+        - s (stim.TableauSimulator or stim.Tableau): the circuit, or a
+          snapshot of it taken with s.current_inverse_tableau().
+    - Outputs:
+        - inverse (stim.Tableau): the inverse tableau of the circuit.
+    """
+    if isinstance(s, stim.Tableau):
+        return s
+    return s.current_inverse_tableau()
+
+
+class MeasurementContext:
+    """
+    Preallocated, bit packed work buffers for measuring an N qubit tableau.
+
+    Buffers (W = ceil(N / 8) bytes):
+        zs (N, 2W): packed X|Z bits of the evolved Z generators.
+        work (N, 2W): scratch matrix for the elimination.
+        signs (N,): sign bits of the generators.
+
+    Per-worker peak memory of a measurement is the buffers, 4NW + N bytes
+    (about N^2 / 2 bytes, 2.9 MB at N = 2400), plus the transient tableaus
+    created by stim during extraction, which take about N^2 / 2 bytes each:
+    two for an entropy sample and four for an OTOC sample (the OTOC needs
+    the signed inverse and the conjugated operator). See peak_bytes.
+
+    params:
+        N (int): number of qubits.
+    """
+
+    # Rows eliminated per block, see supercliffords.gf2.packed_rank.
+    block_rows = None
+
+    # Threads sharing each elimination, see supercliffords.gf2.packed_rank.
+    # Only worth raising for large N, when few realisations run at once.
+    n_threads = 1
+
+    # Matrices with at most this fraction of bits set are eliminated with
+    # sparse row sets, falling back to dense elimination if the fill-in
+    # exceeds the same fraction. See supercliffords.entropy.cut_rank.
+    sparse_density = 0.002
+
+    def __init__(self, N):
+        """
+        Allocate the buffers.
+        """
+        self.N = N
+        self.width = packed_width(N)
+        self.zs = self._allocate("zs", (N, 2 * self.width))
+        self.work = self._allocate("work", (N, 2 * self.width))
+        self.signs = self._allocate("signs", (N,))
+
+    def _allocate(self, name, shape):
+        """
+        Allocate a zeroed uint8 buffer.
+        """
+        return np.zeros(shape, dtype=np.uint8)
+
+    @property
+    def nbytes(self):
+        """Memory held by the buffers, in bytes."""
+        return self.zs.nbytes + self.work.nbytes + self.signs.nbytes
+
+    @staticmethod
+    def peak_bytes(N, otoc=False):
+        """
+        Estimate the peak memory of one measurement on N qubits, in bytes.
+        params:
+            N (int): number of qubits.
+            otoc (bool): whether the measurement is an OTOC.
+        """
+        width = packed_width(N)
+        buffers = 4 * N * width + N
+        tableau = 4 * N * packed_width(max(N, 256))
+        return buffers + (4 if otoc else 2) * tableau
+
+    def _check(self, tableau):
+        """
+        Ensure a tableau matches the size of the buffers.
+        """
+        if len(tableau) != self.N:
+            raise ValueError(
+                f"tableau has {len(tableau)} qubits, context expects {self.N}"
+            )
+
+    def load_stabilizers(self, s):
+        """
+        Load the evolved Z generators of a circuit into the zs buffer,
+        ignoring their signs.
+        params:
+            s (stim.TableauSimulator or stim.Tableau): the circuit, or a
+              snapshot of it taken with s.current_inverse_tableau().
+        """
+        inverse: stim.Tableau = inverse_tableau(s)
+        self._check(inverse)
+        forward = inverse.inverse(unsigned=True)
+        _, _, z2x, z2z, _, _ = forward.to_numpy(bit_packed=True)
+        self.zs[:, : self.width] = z2x
+        self.zs[:, self.width :] = z2z
+
+    def load_generators(self, tableau):
+        """
+        Load the Z generators of a tableau, with their signs, into the work
+        and signs buffers.
+        params:
+            tableau (stim.Tableau): the tableau.
+        """
+        self._check(tableau)
+        _, _, z2x, z2z, _, z_signs = tableau.to_numpy(bit_packed=True)
+        self.work[:, : self.width] = z2x
+        self.work[:, self.width :] = z2z
+        self.signs[:] = np.unpackbits(z_signs, count=self.N, bitorder="little")
+
+    def cut_matrix(self, cut):
+        """
+        Copy the columns of the loaded generators acting on the qubits
+        [0, cut) into the work buffer.
+        params:
+            cut (int): location of the cut.
+        returns:
+            M (np.ndarray of shape (N, 2 * ceil(cut / 8)), uint8): view of
+            the work buffer, X bits in the first half and Z bits in the
+            second.
+        """
+        assert cut < self.N, "cut must be less than N"
+        w = packed_width(cut)
+        M = self.work[:, : 2 * w]
+        M[:, :w] = self.zs[:, :w]
+        mask_tail(M[:, :w], cut)
+        M[:, w:] = self.zs[:, self.width : self.width + w]
+        mask_tail(M[:, w:], cut)
+        return M
+
+    def region_matrix(self, qubits):
+        """
+        Copy the columns of the loaded generators acting on an arbitrary
+        set of qubits into the work buffer.
+        params:
+            qubits (np.ndarray of int): the qubits of the region.
+        returns:
+            M (np.ndarray of shape (N, 2 * ceil(len(qubits) / 8)), uint8):
+            view of the work buffer, X bits in the first half and Z bits in
+            the second.
+        """
+        return self.regions_matrix([qubits])[0]
+
+    def regions_matrix(self, regions):
+        """
+        Copy the columns of the loaded generators acting on several regions
+        into the work buffer, one region after the other.
+        params:
+            regions (list of np.ndarray of int): the qubits of each region.
+        returns:
+            M (np.ndarray of shape (N, w), uint8): for each region in turn,
+            its packed X bits followed by its packed Z bits. A view of the
+            work buffer, unless the padding of the regions to whole bytes
+            makes it too small.
+            bounds (list of int): the column of M at which the block of each
+            region ends.
+        """
+        widths = [packed_width(len(qubits)) for qubits in regions]
+        total = 2 * sum(widths)
+        if total <= self.work.shape[1]:
+            M = self.work[:, :total]
+        else:
+            M = np.zeros((self.N, total), dtype=np.uint8)
+        bounds = []
+        start = 0
+        for qubits, w in zip(regions, widths):
+            qubits = np.asarray(qubits, dtype=np.int64)
+            shift = (qubits & 7).astype(np.uint8)
+            for offset in (0, self.width):
+                bits = (self.zs[:, offset + (qubits >> 3)] >> shift) & 1
+                M[:, start : start + w] = pack_bits(bits)
+                start += w
+            bounds.append(8 * start)
+        return M, bounds
+
+
+class OutOfCoreContext(MeasurementContext):
+    """
+    A measurement context whose buffers live in memory-mapped files, for N
+    too large to hold the elimination matrices in memory alongside parallel
+    realisations. The elimination proceeds in blocks of block_rows rows, so
+    only block_rows * ceil(N / 4) bytes of the matrices are resident at a
+    time (plus the pages the operating system chooses to cache).
+
+    stim keeps its own tableau in memory, about N^2 / 2 bytes, which at
+    N = 20000 is 200 MB; the extraction briefly doubles this.
+
+    params:
+        N (int): number of qubits.
+        directory (str or None): where to create the buffer files. If None,
+          a temporary directory is used and removed with the context.
+        block_rows (int): number of rows eliminated at a time.
+    """
+
+    def __init__(self, N, directory=None, block_rows=4096):
+        """
+        Create the memory-mapped buffers.
+        """
+        self._tmp = None
+        if directory is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="supercliffords-")
+            directory = self._tmp.name
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.block_rows = block_rows
+        super().__init__(N)
+
+    def _allocate(self, name, shape):
+        """
+        Allocate a zeroed uint8 buffer backed by a file.
+        """
+        path = os.path.join(self.directory, f"{name}.bin")
+        return np.memmap(path, dtype=np.uint8, mode="w+", shape=shape)
+
+    def close(self):
+        """
+        Release the buffers and remove the temporary directory, if any.
+        """
+        self.zs = self.work = self.signs = None
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
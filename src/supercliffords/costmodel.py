@@ -0,0 +1,262 @@
+"""
+Module for predicting the runtime and memory of simulations, to size batch
+jobs and to order and pack the points of a sweep.
+
+Calibration times each phase of a simulation at a few system sizes on the
+current machine and fits a power law a * N^b to each of them:
+    <circuit>/evolve: one timestep of the circuit (with slow = 2).
+    entropy, otoc: one measurement with a MeasurementContext, on a fully
+    scrambled operator.
+    reference_entropy, reference_otoc: one measurement with the dense
+    reference implementation (binary_matrix, gf2_rank and ref_binary).
+The fits are cached as json, see CostModel.load.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import stim
+
+from supercliffords.context import MeasurementContext
+from supercliffords.entropy import compute_entropy
+from supercliffords.otoc import compute_otoc
+
+SIZES = (64, 128, 256, 512)
+
+# Slow parameter used to calibrate the evolution; a timestep acts on N /
+# slow qubits, so its cost is scaled by CALIBRATION_SLOW / slow.
+CALIBRATION_SLOW = 2
+
+
+def default_path():
+    """
+    - Purpose: Location of the cached calibration, from the
+      SUPERCLIFFORDS_COSTMODEL environment variable if set.
+    """
+    return os.environ.get(
+        "SUPERCLIFFORDS_COSTMODEL",
+        os.path.join(
+            os.path.expanduser("~"),
+            ".cache",
+            "supercliffords",
+            "costmodel.json",
+        ),
+    )
+
+
+def _time(f, repeats=3):
+    """
+    Median wall time of a call, in seconds.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def fit_power_law(sizes, times):
+    """
+    - Purpose: Fit times = a * sizes^b by least squares in log space.
+    - Outputs:
+        - (a, b) (tuple of float).
+    """
+    b, log_a = np.polyfit(np.log(sizes), np.log(np.maximum(times, 1e-9)), 1)
+    return float(np.exp(log_a)), float(b)
+
+
+class CostModel:
+    """
+    Fitted power laws for the phases of a simulation.
+    params:
+        fits (dict): phase -> (a, b), predicting a * N^b seconds.
+        meta (dict or None): information about the calibration.
+    """
+
+    def __init__(self, fits, meta=None):
+        """
+        Initialize the model.
+        """
+        self.fits = {phase: tuple(fit) for phase, fit in fits.items()}
+        self.meta = meta or {}
+
+    @classmethod
+    def calibrate(
+        cls, circuit_classes, sizes=SIZES, steps=4, reference_max=256
+    ):
+        """
+        Time the phases of a simulation on the current machine.
+        params:
+            circuit_classes (list of type): circuit classes taking (N, slow),
+              e.g. ThreeQuarterCircuit.
+            sizes (tuple of int): system sizes to time.
+            steps (int): number of timesteps evolved before timing one.
+            reference_max (int): largest size at which the reference
+              implementation is timed, as its OTOC scales as N^3.
+        returns:
+            model (CostModel): the fitted model.
+        """
+        samples = {}
+
+        def record(phase, N, seconds):
+            samples.setdefault(phase, ([], []))
+            samples[phase][0].append(N)
+            samples[phase][1].append(seconds)
+
+        for N in sizes:
+            op = stim.TableauSimulator()
+            op.do(stim.Circuit(f"I {N - 1}\nH 0"))
+            op = op.current_inverse_tableau() ** -1
+            ctx = MeasurementContext(N)
+            for circuit_cls in circuit_classes:
+                circuit = circuit_cls(N, CALIBRATION_SLOW)
+                s = stim.TableauSimulator()
+                for stepcount in range(steps):
+                    s = circuit.steps.apply(s, stepcount)
+                record(
+                    f"{circuit_cls.__name__}/evolve",
+                    N,
+                    _time(lambda: circuit.steps.apply(s.copy(), steps)),
+                )
+            # Measurements are timed on a random tableau, the dense late
+            # time case, rather than on the sparse early time operator.
+            s = stim.TableauSimulator()
+            s.set_inverse_tableau(stim.Tableau.random(N))
+            record(
+                "entropy", N, _time(lambda: compute_entropy(s, N // 4, ctx))
+            )
+            record("otoc", N, _time(lambda: compute_otoc(s, N, op, ctx)))
+            if N <= reference_max:
+                record(
+                    "reference_entropy",
+                    N,
+                    _time(lambda: compute_entropy(s, N // 4)),
+                )
+                record(
+                    "reference_otoc", N, _time(lambda: compute_otoc(s, N, op))
+                )
+        fits = {
+            phase: fit_power_law(Ns, times)
+            for phase, (Ns, times) in samples.items()
+            if len(Ns) > 1
+        }
+        return cls(fits, {"sizes": list(sizes), "calibrated": time.time()})
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Load a model saved by CostModel.save.
+        """
+        with open(path or default_path()) as f:
+            data = json.load(f)
+        return cls(data["fits"], data.get("meta"))
+
+    def save(self, path=None):
+        """
+        Write the model to a json file.
+        """
+        path = path or default_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"fits": self.fits, "meta": self.meta}, f, indent=1)
+
+    def predict(self, phase, N):
+        """
+        Predicted time of one call of a phase on N qubits, in seconds.
+        """
+        if phase not in self.fits:
+            raise KeyError(f"phase {phase!r} has not been calibrated")
+        a, b = self.fits[phase]
+        return a * N**b
+
+    def estimate(
+        self,
+        circuit_cls,
+        N,
+        t,
+        res,
+        rep,
+        n_jobs=1,
+        kind="entropy",
+        slow=CALIBRATION_SLOW,
+        reference=False,
+    ):
+        """
+        Predict the cost of a run of a parallel driver.
+        params:
+            circuit_cls (type or str): the circuit class, or its name.
+            N, t, res, rep, n_jobs: see Circuit.compute_entropy_parallel.
+            kind (str): "entropy" or "otoc".
+            slow (int): the slow parameter of the circuit.
+            reference (bool): whether the measurements use the dense
+              reference implementation rather than a MeasurementContext.
+        returns:
+            cost (dict): "cpu_time" and "wall_time" in seconds, and
+            "peak_bytes", the peak memory of the workers.
+        """
+        name = getattr(circuit_cls, "__name__", circuit_cls)
+        evolve = self.predict(f"{name}/evolve", N) * CALIBRATION_SLOW / slow
+        phase = f"reference_{kind}" if reference else kind
+        per_rep = t * evolve + (t // res) * self.predict(phase, N)
+        n_jobs = max(1, min(n_jobs, rep))
+        return {
+            "cpu_time": rep * per_rep,
+            "wall_time": -(-rep // n_jobs) * per_rep,
+            "peak_bytes": n_jobs * peak_bytes(N, kind, reference),
+        }
+
+    def pack(self, jobs, n_workers):
+        """
+        Order the points of a sweep by predicted cost and pack them onto
+        workers, longest first, each going to the least loaded worker.
+        params:
+            jobs (list of dict): keyword arguments of estimate for each
+              point, with n_jobs = 1.
+            n_workers (int): number of workers.
+        returns:
+            bins (list of lists): the indices of the jobs run by each worker,
+            in the order they should be run.
+            loads (list of float): the predicted busy time of each worker.
+        """
+        costs = [self.estimate(**job)["cpu_time"] for job in jobs]
+        bins = [[] for _ in range(n_workers)]
+        loads = [0.0] * n_workers
+        for i in sorted(range(len(jobs)), key=lambda i: -costs[i]):
+            w = int(np.argmin(loads))
+            bins[w].append(i)
+            loads[w] += costs[i]
+        return bins, loads
+
+
+def peak_bytes(N, kind="entropy", reference=False):
+    """
+    - Purpose: Estimate the peak memory of one worker simulating N qubits.
+    - Inputs:
+        - N (int): number of qubits.
+        - kind (str): "entropy" or "otoc".
+        - reference (bool): whether the dense reference implementation is
+          used for the measurements.
+    - Outputs:
+        - peak (int): bytes held by stim's tableau and the measurement.
+    """
+    tableau = N * N // 2
+    if reference:
+        # Dense float64 copies of the (N, 2N) generator matrix.
+        return tableau + (3 if kind == "entropy" else 4) * 16 * N * N
+    return tableau + MeasurementContext.peak_bytes(N, otoc=kind == "otoc")
+
+
+if __name__ == "__main__":
+    import sys
+
+    from supercliffords.circuits import AlternatingCircuit, ThreeQuarterCircuit
+
+    path = sys.argv[1] if len(sys.argv) > 1 else default_path()
+    model = CostModel.calibrate([ThreeQuarterCircuit, AlternatingCircuit])
+    model.save(path)
+    for phase, (a, b) in sorted(model.fits.items()):
+        print(f"{phase}: {a:.3g} * N^{b:.2f} s")
+    print(f"saved to {path}")
@@ -0,0 +1,258 @@
+"""
+Module for running the circuit drivers on several machines through a task
+queue kept on a shared filesystem.
+
+A coordinator splits a range of seeds into tasks, each running a driver of a
+circuit once per seed, and writes them to the queue. Workers on any machine
+that can see the queue directory claim tasks by atomically renaming them,
+run them and write their results. Tasks are named after their contents, so
+submitting the same work twice, or a task being run by two workers after a
+stale claim is requeued, gives the same result file.
+
+Layout of the queue directory:
+    tasks/<id>.pkl: tasks waiting to be claimed.
+    claimed/<id>.pkl: tasks being run.
+    results/<id>.npz: finished tasks.
+"""
+
+import hashlib
+import os
+import pickle
+import socket
+import time
+
+import numpy as np
+
+
+class TaskQueue:
+    """
+    A task queue in a directory shared by the coordinator and the workers.
+    params:
+        root (str): directory of the queue, created if missing.
+    """
+
+    def __init__(self, root):
+        """
+        Open (or create) a queue.
+        """
+        self.root = root
+        for sub in ("tasks", "claimed", "results"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    def _path(self, sub, task_id):
+        ext = ".npz" if sub == "results" else ".pkl"
+        return os.path.join(self.root, sub, task_id + ext)
+
+    def _ids(self, sub):
+        return sorted(
+            os.path.splitext(f)[0]
+            for f in os.listdir(os.path.join(self.root, sub))
+            if not f.startswith(".")
+        )
+
+    def submit(self, circuit, method, args, seeds, chunk=1):
+        """
+        Add the runs of a driver for a range of seeds to the queue.
+        params:
+            circuit (supercliffords.circuits.Circuit): the circuit.
+            method (str): name of the driver, e.g. "compute_entropy". It is
+              called as getattr(circuit, method)(*args, seed=seed) and must
+              return a pair (values, ts).
+            args (tuple): arguments of the driver, usually with rep = 1.
+            seeds (iterable of int): seeds to run.
+            chunk (int): number of seeds per task.
+        returns:
+            ids (list of str): the ids of the tasks, including those that
+            were already queued or finished.
+        """
+        seeds = [int(seed) for seed in seeds]
+        key = hashlib.sha1(pickle.dumps((circuit, method, args))).hexdigest()
+        ids = []
+        for start in range(0, len(seeds), chunk):
+            block = seeds[start : start + chunk]
+            task_id = f"{key[:16]}-{block[0]:010d}-{len(block)}"
+            ids.append(task_id)
+            if any(
+                os.path.exists(self._path(sub, task_id))
+                for sub in ("tasks", "claimed", "results")
+            ):
+                continue
+            task = {
+                "id": task_id,
+                "circuit": circuit,
+                "method": method,
+                "args": args,
+                "seeds": block,
+            }
+            tmp = os.path.join(self.root, "tasks", f".{task_id}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(task, f)
+            os.replace(tmp, self._path("tasks", task_id))
+        return ids
+
+    def claim(self):
+        """
+        Claim the next waiting task.
+        returns:
+            task (dict or None): the task, or None if no task is waiting.
+        """
+        for task_id in self._ids("tasks"):
+            claimed = self._path("claimed", task_id)
+            try:
+                os.rename(self._path("tasks", task_id), claimed)
+            except FileNotFoundError:
+                continue  # claimed by another worker.
+            # Renaming keeps the modification time, so mark the claim.
+            os.utime(claimed)
+            with open(claimed, "rb") as f:
+                return pickle.load(f)
+        return None
+
+    def complete(self, task, values, ts):
+        """
+        Store the result of a task and release its claim.
+        params:
+            task (dict): the task, as returned by claim.
+            values (np.ndarray): array of shape (len(task["seeds"]), len(ts)).
+            ts (np.ndarray): timesteps of the values.
+        """
+        path = self._path("results", task["id"])
+        tmp = os.path.join(self.root, "results", f".{task['id']}.tmp.npz")
+        np.savez(tmp, values=values, ts=ts, seeds=np.array(task["seeds"]))
+        os.replace(tmp, path)
+        try:
+            os.remove(self._path("claimed", task["id"]))
+        except FileNotFoundError:
+            pass
+
+    def requeue(self, timeout):
+        """
+        Return to the queue the tasks claimed more than timeout seconds ago,
+        e.g. by a worker that died.
+        returns:
+            ids (list of str): the requeued tasks.
+        """
+        ids = []
+        now = time.time()
+        for task_id in self._ids("claimed"):
+            claimed = self._path("claimed", task_id)
+            try:
+                if now - os.path.getmtime(claimed) < timeout:
+                    continue
+                os.rename(claimed, self._path("tasks", task_id))
+            except FileNotFoundError:
+                continue
+            ids.append(task_id)
+        return ids
+
+    def status(self):
+        """
+        Number of waiting, claimed and finished tasks.
+        """
+        return {
+            sub: len(self._ids(sub)) for sub in ("tasks", "claimed", "results")
+        }
+
+    def result(self, task_id):
+        """
+        The result of a finished task.
+        returns:
+            values (np.ndarray), ts (np.ndarray), seeds (np.ndarray), or
+            None if the task has not finished.
+        """
+        path = self._path("results", task_id)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as npz:
+            return npz["values"], npz["ts"], npz["seeds"]
+
+    def gather(self, ids, poll=1.0, timeout=None, requeue_after=None):
+        """
+        Wait for tasks to finish and collect their results.
+        params:
+            ids (list of str): the tasks, as returned by submit.
+            poll (float): seconds between checks of the queue.
+            timeout (float or None): give up after this many seconds.
+            requeue_after (float or None): requeue claims older than this
+              many seconds while waiting, see requeue.
+        returns:
+            values (np.ndarray): array of shape (seeds, len(ts)), one row per
+            seed in the order of submission.
+            ts (np.ndarray): timesteps of the values.
+            seeds (np.ndarray): the seed of each row.
+        """
+        start = time.time()
+        while True:
+            results = [self.result(task_id) for task_id in ids]
+            if all(r is not None for r in results):
+                break
+            if timeout is not None and time.time() - start > timeout:
+                missing = sum(r is None for r in results)
+                raise TimeoutError(f"{missing} tasks did not finish")
+            if requeue_after is not None:
+                self.requeue(requeue_after)
+            time.sleep(poll)
+        values = np.concatenate([r[0] for r in results], axis=0)
+        seeds = np.concatenate([r[2] for r in results])
+        return values, results[0][1], seeds
+
+
+def run_task(task):
+    """
+    - Purpose: Run a task.
+    - Inputs:
+        - task (dict): a task, as returned by TaskQueue.claim.
+    - Outputs:
+        - values (np.ndarray): one row of values per seed.
+        - ts (np.ndarray): timesteps of the values.
+    """
+    driver = getattr(task["circuit"], task["method"])
+    rows = []
+    for seed in task["seeds"]:
+        values, ts = driver(*task["args"], seed=seed)
+        rows.append(values)
+    return np.array(rows), ts
+
+
+def run_worker(root, poll=1.0, idle_timeout=None, max_tasks=None):
+    """
+    - Purpose: Claim and run tasks from a queue until it stays empty.
+    - Inputs:
+        - root (str): directory of the queue.
+        - poll (float): seconds between checks of an empty queue.
+        - idle_timeout (float or None): stop after the queue has been empty
+          for this many seconds. None waits for tasks forever.
+        - max_tasks (int or None): stop after running this many tasks.
+    - Outputs:
+        - n_tasks (int): the number of tasks run.
+    """
+    queue = TaskQueue(root)
+    n_tasks = 0
+    idle_since = time.time()
+    while max_tasks is None or n_tasks < max_tasks:
+        task = queue.claim()
+        if task is None:
+            if (
+                idle_timeout is not None
+                and time.time() - idle_since > idle_timeout
+            ):
+                break
+            time.sleep(poll)
+            continue
+        values, ts = run_task(task)
+        queue.complete(task, values, ts)
+        n_tasks += 1
+        idle_since = time.time()
+    return n_tasks
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) not in (2, 3):
+        sys.exit(
+            "usage: python -m supercliffords.distributed QUEUE_DIR [IDLE_TIMEOUT]"
+        )
+    idle = float(sys.argv[2]) if len(sys.argv) == 3 else None
+    n = run_worker(sys.argv[1], idle_timeout=idle)
+    print(f"{socket.gethostname()}:{os.getpid()} ran {n} tasks")
@@ -0,0 +1,313 @@
+"""
+Module with a registry of measurement engines, implementations of the
+entropy and OTOC measurements that can be swapped for one another.
+
+Registered engines:
+    reference: the dense implementation of supercliffords.entropy and
+      supercliffords.otoc (binary_matrix, gf2_rank and ref_binary).
+    packed: bit packed NumPy elimination with a MeasurementContext.
+    threaded: as packed, with each elimination shared by every core.
+    stim: entropies read off stim's canonical_stabilizers (entropy only).
+
+check compares an engine with the reference on random tableaus, and
+autotune times the conforming engines on the current machine and caches the
+fastest engine for each range of N, which select then returns.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import stim
+
+from supercliffords.context import MeasurementContext, inverse_tableau
+from supercliffords.entropy import compute_entropy
+from supercliffords.otoc import compute_otoc
+
+ENGINES = {}
+
+KINDS = ("entropy", "otoc")
+
+DEFAULT_ENGINE = "packed"
+
+# Autotuned choices loaded by select, keyed by path.
+_TUNED = {}
+
+
+class Engine:
+    """
+    An implementation of the measurements.
+    params:
+        name (str): name of the engine.
+        entropy (callable or None): entropy(s, cut, ctx), see
+          supercliffords.entropy.compute_entropy.
+        otoc (callable or None): otoc(s, N, op, ctx), see
+          supercliffords.otoc.compute_otoc.
+        context (callable or None): context(N) returning the ctx passed to
+          the measurements, or None if they do not use one.
+    """
+
+    def __init__(self, name, entropy=None, otoc=None, context=None):
+        """
+        Initialize the engine.
+        """
+        self.name = name
+        self.entropy = entropy
+        self.otoc = otoc
+        self._context = context
+
+    def supports(self, kind):
+        return getattr(self, kind) is not None
+
+    def context(self, N):
+        """
+        Work buffers for measuring N qubits with this engine.
+        """
+        if self._context is None:
+            return None
+        return self._context(N)
+
+    def observable(self, kind, **params):
+        """
+        The measurement as an observable(s, ctx), for
+        Circuit.compute_observable and the measurement pipeline.
+        params:
+            kind (str): "entropy" or "otoc".
+            params: cut for an entropy; N and op for an OTOC.
+        """
+        if kind == "entropy":
+            return lambda s, ctx: self.entropy(s, params["cut"], ctx)
+        return lambda s, ctx: self.otoc(s, params["N"], params["op"], ctx)
+
+
+def register(engine):
+    """
+    - Purpose: Add an engine to the registry, replacing any engine with the
+      same name.
+    """
+    ENGINES[engine.name] = engine
+    return engine
+
+
+def get_engine(name):
+    if name not in ENGINES:
+        raise KeyError(f"unknown engine {name!r}, have {sorted(ENGINES)}")
+    return ENGINES[name]
+
+
+def canonical_entropies(s):
+    """
+    - Purpose: Compute the entropy across every cut [0, cut) of a circuit
+      from the canonical form of its stabilizers. The canonical form is in
+      row echelon form with the qubits in order, so the rank of the
+      generators restricted to [0, cut) is the number of stabilizers whose
+      first non-identity qubit is below cut.
+    - Inputs:
+        - s (stim.TableauSimulator or stim.Tableau): the circuit, or a
+          snapshot of it taken with s.current_inverse_tableau().
+    - Outputs:
+        - S (np.ndarray of int): S[cut] is the entropy across cut, for cut
+          from 0 to N.
+    """
+    if isinstance(s, stim.Tableau):
+        simulator = stim.TableauSimulator()
+        simulator.set_inverse_tableau(s)
+        s = simulator
+    stabilizers = s.canonical_stabilizers()
+    N = len(stabilizers)
+    leads = np.array(
+        [np.argmax(np.bitwise_or(*p.to_numpy())) for p in stabilizers],
+        dtype=np.int64,
+    )
+    ranks = np.cumsum(np.bincount(leads, minlength=N))
+    return np.concatenate([[0], ranks - np.arange(1, N + 1)])
+
+
+def _threaded_context(N):
+    ctx = MeasurementContext(N)
+    ctx.n_threads = os.cpu_count() or 1
+    return ctx
+
+
+register(
+    Engine(
+        "reference",
+        entropy=lambda s, cut, ctx: compute_entropy(s, cut),
+        otoc=lambda s, N, op, ctx: compute_otoc(s, N, op),
+    )
+)
+register(
+    Engine(
+        "packed",
+        entropy=compute_entropy,
+        otoc=compute_otoc,
+        context=MeasurementContext,
+    )
+)
+register(
+    Engine(
+        "threaded",
+        entropy=compute_entropy,
+        otoc=compute_otoc,
+        context=_threaded_context,
+    )
+)
+register(
+    Engine(
+        "stim",
+        entropy=lambda s, cut, ctx: int(canonical_entropies(s)[cut]),
+    )
+)
+
+
+def _random_circuit(N):
+    """
+    A simulator in a random Clifford state, and a random operator.
+    """
+    s = stim.TableauSimulator()
+    s.set_inverse_tableau(stim.Tableau.random(N))
+    return s, stim.Tableau.random(N)
+
+
+def check(engine, sizes=(5, 12, 33), samples=3):
+    """
+    - Purpose: Check an engine against the reference on random tableaus.
+    - Inputs:
+        - engine (Engine or str): the engine.
+        - sizes (tuple of int): numbers of qubits to test.
+        - samples (int): random tableaus per size.
+    - Outputs:
+        - failures (list of str): description of every disagreement, empty
+          if the engine conforms.
+    """
+    if isinstance(engine, str):
+        engine = get_engine(engine)
+    reference = ENGINES["reference"]
+    failures = []
+    for N in sizes:
+        ctx = engine.context(N)
+        for _ in range(samples):
+            s, op = _random_circuit(N)
+            snapshot = inverse_tableau(s)
+            if engine.supports("entropy"):
+                for cut in sorted({1, N // 4, N // 2, N - 1}):
+                    got = engine.entropy(snapshot, cut, ctx)
+                    expected = reference.entropy(s, cut, None)
+                    if got != expected:
+                        failures.append(
+                            f"{engine.name}: entropy N={N} cut={cut}: "
+                            f"{got} != {expected}"
+                        )
+            if engine.supports("otoc"):
+                got = engine.otoc(snapshot, N, op, ctx)
+                expected = reference.otoc(s, N, op, None)
+                if got != expected:
+                    failures.append(
+                        f"{engine.name}: otoc N={N}: {got} != {expected}"
+                    )
+    return failures
+
+
+def default_path():
+    """
+    - Purpose: Location of the cached autotuning, from the
+      SUPERCLIFFORDS_ENGINES environment variable if set.
+    """
+    return os.environ.get(
+        "SUPERCLIFFORDS_ENGINES",
+        os.path.join(
+            os.path.expanduser("~"), ".cache", "supercliffords", "engines.json"
+        ),
+    )
+
+
+def autotune(sizes=(64, 256, 1024), engines=None, repeats=3, path=None):
+    """
+    - Purpose: Time the engines on the current machine and cache the
+      fastest engine for each kind of measurement and range of N. Engines
+      failing check are skipped, and so is the reference engine above
+      N = 256, where it is slower than every other engine by far.
+    - Inputs:
+        - sizes (tuple of int): numbers of qubits to time.
+        - engines (list of str or None): engines to consider, defaults to
+          every registered engine.
+        - repeats (int): timed measurements per engine and size.
+        - path (str or None): where to cache the choices, default_path() if
+          None. Pass False to not write them.
+    - Outputs:
+        - choices (dict): kind -> list of [N, engine name] pairs, sorted by
+          N. Each engine is chosen for N from its entry up to the next.
+    """
+    names = sorted(ENGINES) if engines is None else list(engines)
+    names = [
+        name for name in names if not check(name, sizes=(5, 12), samples=1)
+    ]
+    choices = {kind: [] for kind in KINDS}
+    for N in sorted(sizes):
+        s, op = _random_circuit(N)
+        snapshot = inverse_tableau(s)
+        for kind in KINDS:
+            times = {}
+            for name in names:
+                engine = ENGINES[name]
+                if not engine.supports(kind):
+                    continue
+                if name == "reference" and N > 256:
+                    continue
+                ctx = engine.context(N)
+                args = (N // 4,) if kind == "entropy" else (N, op)
+                measure = getattr(engine, kind)
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    measure(snapshot, *args, ctx)
+                times[name] = time.perf_counter() - start
+            choices[kind].append([N, min(times, key=times.get)])
+    if path is not False:
+        path = path or default_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(choices, f, indent=1)
+        _TUNED[path] = choices
+    return choices
+
+
+def select(kind, N, path=None):
+    """
+    - Purpose: Return the engine autotuned for a measurement on N qubits.
+    - Inputs:
+        - kind (str): "entropy" or "otoc".
+        - N (int): number of qubits.
+        - path (str or None): the cached autotuning, default_path() if None.
+    - Outputs:
+        - engine (Engine): the engine chosen for the largest tuned size not
+          above N (the smallest tuned size if N is below all of them), or
+          the packed engine if the machine has not been autotuned.
+    """
+    path = path or default_path()
+    if path not in _TUNED:
+        try:
+            with open(path) as f:
+                _TUNED[path] = json.load(f)
+        except FileNotFoundError:
+            _TUNED[path] = {}
+    entries = _TUNED[path].get(kind)
+    if not entries:
+        return ENGINES[DEFAULT_ENGINE]
+    name = entries[0][1]
+    for size, candidate in entries:
+        if size <= N:
+            name = candidate
+    return ENGINES.get(name, ENGINES[DEFAULT_ENGINE])
+
+
+if __name__ == "__main__":
+    import sys
+
+    for name in sorted(ENGINES):
+        failures = check(name)
+        print(f"{name}: {'ok' if not failures else failures}")
+    path = sys.argv[1] if len(sys.argv) > 1 else default_path()
+    for kind, entries in autotune(path=path).items():
+        print(kind, ", ".join(f"N>={N}: {name}" for N, name in entries))
+    print(f"saved to {path}")
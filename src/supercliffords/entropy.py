@@ -4,18 +4,26 @@ Module with functions used to compute the entropy.
 
 import stim
 import numpy as np
+from supercliffords.gf2 import (
+    packed_pivots,
+    packed_rank,
+    packed_to_sets,
+    sparse_rank,
+)
+from supercliffords.context import MeasurementContext, inverse_tableau
 
 
 def sample_stabilisers(s):
     """
     - Purpose: Use stim to simulate a circuit.
     -Inputs:
-         - s (stim.circuit): Any circuit you like which you wish to simulate.
+         - s (stim.circuit): Any circuit you like which you wish to simulate,
+           or a snapshot of it taken with s.current_inverse_tableau().
     -Outputs:
          - zs2 (np.ndarray): The result of conjugating the Z generators by the
            given stim circuit.
     """
-    tableau: stim.Tableau = s.current_inverse_tableau() ** -1
+    tableau: stim.Tableau = inverse_tableau(s) ** -1
     n = len(tableau)
     zs = [tableau.z_output(k) for k in range(n)]
     zs2 = np.array(zs)
@@ -133,15 +141,181 @@ def gf2_rank(rows):
     return rank
 
 
-def compute_entropy(s: stim.Circuit, cut: int):
+def cut_rank(M, n_cols, ctx):
+    """
+    - Purpose: Find the rank of a packed cut matrix, using sparse elimination
+      when the matrix is sparse (e.g. at early times, when the evolved
+      operator has small support) and dense elimination otherwise.
+    - Inputs:
+        - M (np.ndarray, uint8): packed cut matrix, overwritten.
+        - n_cols (int): number of columns of the cut matrix.
+        - ctx (supercliffords.context.MeasurementContext): the context,
+          providing the sparse_density and block_rows settings.
+    - Outputs:
+        - rank (int): rank of the cut matrix over F2.
+    """
+    limit = ctx.sparse_density * M.shape[0] * n_cols
+    # Each non-zero byte holds at least one set bit.
+    if np.count_nonzero(M) <= limit:
+        rank = sparse_rank(packed_to_sets(M), max_fill=limit)
+        if rank is not None:
+            return rank
+    return packed_rank(M, block_rows=ctx.block_rows, n_threads=ctx.n_threads)
+
+
+def region_entropy(ctx, qubits):
+    """
+    - Purpose: Compute the entropy of the generators loaded in a context
+      across the cut between a region and the remaining qubits.
+    - Inputs:
+        - ctx (supercliffords.context.MeasurementContext): context holding
+          the generators, see MeasurementContext.load_stabilizers.
+        - qubits (np.ndarray of int): the qubits of the region.
+    - Outputs:
+        - S (int): The entropy across the cut.
+    """
+    M = ctx.region_matrix(qubits)
+    return cut_rank(M, 2 * len(qubits), ctx) - len(qubits)
+
+
+def prefix_entropies(ctx, regions):
+    """
+    - Purpose: Compute the entropies of the unions of the first k regions,
+      for every k, from a single elimination of the generators loaded in a
+      context.
+    - Inputs:
+        - ctx (supercliffords.context.MeasurementContext): context holding
+          the generators, see MeasurementContext.load_stabilizers.
+        - regions (list of np.ndarray of int): disjoint sets of qubits.
+    - Outputs:
+        - S (list of int): S[k] is the entropy of regions[0] + ... +
+          regions[k].
+    """
+    M, bounds = ctx.regions_matrix(regions)
+    pivots = packed_pivots(M, bounds[-1], ctx.block_rows, ctx.n_threads)
+    sizes = np.cumsum([len(qubits) for qubits in regions])
+    return [
+        int(np.count_nonzero(pivots < bound)) - int(size)
+        for bound, size in zip(bounds, sizes)
+    ]
+
+
+def _load(s, ctx):
+    """
+    Load the generators of a circuit into a context, creating one if needed.
+    """
+    inverse = inverse_tableau(s)
+    if ctx is None:
+        ctx = MeasurementContext(len(inverse))
+    ctx.load_stabilizers(inverse)
+    return ctx
+
+
+def compute_region_entropy(s, qubits, ctx=None):
+    """
+    - Purpose: Compute the entropy of a circuit across the cut between an
+      arbitrary set of qubits and the remaining qubits.
+    - Inputs:
+        - s (stim.TableauSimulator or stim.Tableau): the circuit, or a
+          snapshot of it taken with s.current_inverse_tableau().
+        - qubits (iterable of int): the qubits of the region.
+        - ctx (supercliffords.context.MeasurementContext or None): work
+          buffers to compute the entropy in.
+    - Outputs:
+        - S (int): The entropy of the region.
+    """
+    return region_entropy(_load(s, ctx), np.asarray(list(qubits)))
+
+
+def compute_information(s, A, B, C=None, ctx=None):
+    """
+    - Purpose: Compute the entropies of two or three disjoint regions and
+      of their unions, with the mutual and tripartite informations, from a
+      single extraction of the tableau. The entropies of all the unions are
+      read off prefixes of the same eliminations: [A|B] and [B] for two
+      regions, [A|B|C], [B|C] and [C|A] for three.
+    - Inputs:
+        - s (stim.TableauSimulator or stim.Tableau): the circuit, or a
+          snapshot of it taken with s.current_inverse_tableau().
+        - A, B, C (iterables of int): disjoint sets of qubits. C is
+          optional.
+        - ctx (supercliffords.context.MeasurementContext or None): work
+          buffers to compute the entropies in.
+    - Outputs:
+        - info (dict): the entropies "A", "B", "AB" and the mutual
+          information "I(A:B)". With C, also the entropies "C", "AC", "BC",
+          "ABC" and the tripartite information "I3".
+    """
+    regions = [
+        np.asarray(list(r), dtype=np.int64) for r in (A, B, C) if r is not None
+    ]
+    qubits = np.concatenate(regions)
+    if len(np.unique(qubits)) != len(qubits):
+        raise ValueError("regions must be disjoint")
+    ctx = _load(s, ctx)
+    info = {}
+    if C is None:
+        info["A"], info["AB"] = prefix_entropies(ctx, regions)
+        (info["B"],) = prefix_entropies(ctx, regions[1:])
+    else:
+        A, B, C = regions
+        info["A"], info["AB"], info["ABC"] = prefix_entropies(ctx, [A, B, C])
+        info["B"], info["BC"] = prefix_entropies(ctx, [B, C])
+        info["C"], info["AC"] = prefix_entropies(ctx, [C, A])
+        info["I3"] = (
+            info["A"]
+            + info["B"]
+            + info["C"]
+            - info["AB"]
+            - info["BC"]
+            - info["AC"]
+            + info["ABC"]
+        )
+    info["I(A:B)"] = info["A"] + info["B"] - info["AB"]
+    return info
+
+
+def compute_entropy(
+    s: stim.Circuit, cut: int, ctx=None, subsets=None, rng=None
+):
     """
     - Purpose: Compute the entropy of a circuit.
     - Inputs:
-        - s (stim.Circuit): The circuit you wish to compute the entropy of.
+        - s (stim.Circuit): The circuit you wish to compute the entropy of,
+          or a snapshot of it taken with s.current_inverse_tableau().
         - cut (integer): The cut across which to compute the entropy.
+        - ctx (supercliffords.context.MeasurementContext or None): work
+          buffers to compute the entropy in. If None, the dense reference
+          implementation is used.
+        - subsets (int or None): if given, the entropy is computed across
+          the cuts of this many random regions of cut qubits, instead of
+          the qubits [0, cut), sharing a single extraction of the tableau.
+          For circuits acting on random permutations of the qubits every
+          region is statistically equivalent, so this reduces the variance
+          of the estimate at little cost.
+        - rng (np.random.Generator or None): generator drawing the regions.
+          Defaults to a freshly seeded generator, leaving the global NumPy
+          random state, which drives the circuits, untouched.
     - Outputs:
-        - S (float): The entropy of the circuit.
+        - S (float): The entropy of the circuit. When subsets is given, the
+          pair (mean, var) of the mean and variance of the entropy over the
+          regions.
     """
+    if subsets is not None:
+        ctx = _load(s, ctx)
+        if rng is None:
+            rng = np.random.default_rng()
+        values = np.array(
+            [
+                region_entropy(ctx, np.sort(rng.permutation(ctx.N)[:cut]))
+                for _ in range(subsets)
+            ]
+        )
+        return values.mean(), values.var(ddof=1) if subsets > 1 else 0.0
+    if ctx is not None:
+        ctx.load_stabilizers(s)
+        M = ctx.cut_matrix(cut)
+        return cut_rank(M, 2 * cut, ctx) - cut
     zs2 = sample_stabilisers(s)
     mat = binary_matrix(zs2)
     b2 = get_cut_stabilizers(mat, cut)
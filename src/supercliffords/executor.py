@@ -0,0 +1,111 @@
+"""
+Module defining a persistent pool of worker processes for the parallel
+drivers.
+
+Creating a multiprocessing.Pool for every call forks the workers and
+re-imports stim and numpy in each of them, which dominates short runs in a
+sweep. A CircuitExecutor keeps its workers alive between calls, and each
+worker keeps the circuits it has seen, so a circuit is only unpickled once
+per worker.
+"""
+
+import atexit
+import hashlib
+import pickle
+from multiprocessing import Pool
+
+# Circuits unpickled by this worker process, keyed by the digest of their
+# pickle.
+_CIRCUITS = {}
+
+# Executor shared by the drivers, see get_executor.
+_SHARED = None
+
+
+def _call(digest, payload, method, args):
+    """
+    Run a method of a circuit in a worker, unpickling the circuit only the
+    first time the worker sees it.
+    """
+    circuit = _CIRCUITS.get(digest)
+    if circuit is None:
+        circuit = _CIRCUITS[digest] = pickle.loads(payload)
+    return getattr(circuit, method)(*args)
+
+
+class CircuitExecutor:
+    """
+    A pool of worker processes that is reused across driver calls.
+    params:
+        n_jobs (int): number of worker processes.
+    """
+
+    def __init__(self, n_jobs):
+        """
+        Start the workers.
+        """
+        self.n_jobs = n_jobs
+        self._pool = Pool(n_jobs)
+
+    def starmap(self, circuit, method, args):
+        """
+        Call a method of a circuit once for each tuple of arguments.
+        params:
+            circuit (supercliffords.circuits.Circuit): the circuit.
+            method (str): name of the method, e.g. "compute_entropy".
+            args (list of tuples): arguments of each call.
+        returns:
+            results (list): the return value of each call, in order.
+        """
+        if self._pool is None:
+            raise ValueError("executor is closed")
+        payload = pickle.dumps(circuit)
+        digest = hashlib.sha1(payload).hexdigest()
+        return self._pool.starmap(
+            _call, [(digest, payload, method, a) for a in args]
+        )
+
+    def close(self):
+        """
+        Stop the workers.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def get_executor(n_jobs):
+    """
+    - Purpose: Return the executor shared by the drivers, starting it (or
+      restarting it with a different number of workers) if needed. It is
+      stopped when the interpreter exits.
+    - Inputs:
+        - n_jobs (int): number of worker processes.
+    - Outputs:
+        - executor (CircuitExecutor): the shared executor.
+    """
+    global _SHARED
+    if _SHARED is None or _SHARED.n_jobs != n_jobs:
+        shutdown_executor()
+        _SHARED = CircuitExecutor(n_jobs)
+    return _SHARED
+
+
+def shutdown_executor():
+    """
+    - Purpose: Stop the shared executor, if it is running.
+    """
+    global _SHARED
+    if _SHARED is not None:
+        _SHARED.close()
+        _SHARED = None
+
+
+atexit.register(shutdown_executor)
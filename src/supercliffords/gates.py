@@ -1,4 +1,8 @@
-"""Module defining the super-clifford gates."""
+"""Module defining the super-clifford gates.
+
+The circuits are parsed from text, which is much faster than appending the
+operations one at a time.
+"""
 
 import stim
 
@@ -14,10 +18,7 @@ def C3(i, j, k):
           - c (stim.circuit): a stim circuit that applies C3 to the chosen
             qubits.
     """
-    c = stim.Circuit()
-    c.append_operation("CY", [i, j])
-    c.append_operation("CY", [i, k])
-    return c
+    return stim.Circuit(f"CY {i} {j} {i} {k}")
 
 
 def ZH(k):
@@ -30,10 +31,7 @@ def ZH(k):
           - c (stim.circuit): a stim circuit that applies Z.H to the chosen
             qubit.
     """
-    c = stim.Circuit()
-    c.append_operation("H", [k])
-    c.append_operation("Z", [k])
-    return c
+    return stim.Circuit(f"H {k}\nZ {k}")
 
 
 def SWP(i, j):
@@ -47,6 +45,4 @@ def SWP(i, j):
           - c (stim.circuit): a stim circuit that applies SWAP to the chosen
             qubits.
     """
-    c = stim.Circuit()
-    c.append_operation("SWAP", [i, j])
-    return c
+    return stim.Circuit(f"SWAP {i} {j}")
@@ -0,0 +1,330 @@
+"""
+Module with GF(2) elimination kernels acting on bit packed matrices.
+
+Rows of a matrix are stored as uint8 arrays with the bits packed in little
+endian order, as produced by ``np.packbits(..., bitorder="little")`` and by
+``stim.Tableau.to_numpy(bit_packed=True)``. Column j of a packed matrix is
+bit (j % 8) of byte (j // 8).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Number of set bits in every possible byte.
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Eliminations touching fewer bytes than this for a pivot are done on the
+# calling thread, as handing them to a pool costs more than it saves.
+PARALLEL_BYTES = 1 << 18
+
+
+def packed_width(n_bits):
+    """
+    - Purpose: Number of bytes needed to store n_bits bits.
+    """
+    return (n_bits + 7) // 8
+
+
+def pack_bits(bits):
+    """
+    - Purpose: Bit pack a binary matrix along its rows.
+    - Inputs:
+        - bits (np.ndarray of shape (n, m)): a binary matrix.
+    - Outputs:
+        - packed (np.ndarray of shape (n, ceil(m / 8)), uint8).
+    """
+    return np.packbits(
+        np.asarray(bits, dtype=np.uint8), axis=1, bitorder="little"
+    )
+
+
+def unpack_bits(packed, n_bits):
+    """
+    - Purpose: Inverse of pack_bits.
+    - Inputs:
+        - packed (np.ndarray of shape (n, w), uint8): packed matrix.
+        - n_bits (int): number of columns of the unpacked matrix.
+    - Outputs:
+        - bits (np.ndarray of shape (n, n_bits), uint8).
+    """
+    return np.unpackbits(packed, axis=1, count=n_bits, bitorder="little")
+
+
+def popcount(packed, axis=-1):
+    """
+    - Purpose: Count the set bits of a packed array along an axis.
+    """
+    return POPCOUNT[packed].sum(axis=axis, dtype=np.int64)
+
+
+def mask_tail(packed, n_bits):
+    """
+    - Purpose: Clear the bits of the last byte of each row beyond n_bits.
+    - Inputs:
+        - packed (np.ndarray of shape (n, ceil(n_bits / 8)), uint8): modified
+          in place.
+        - n_bits (int): number of valid bits in each row.
+    """
+    if n_bits % 8:
+        packed[:, -1] &= np.uint8((1 << (n_bits % 8)) - 1)
+
+
+def _column(j, width, n_cols):
+    """
+    Byte and bit mask of column j of a matrix made of two halves of n_cols
+    columns each, the second half starting at byte width.
+    """
+    if j >= n_cols:
+        j -= n_cols
+        return width + (j >> 3), np.uint8(1 << (j & 7))
+    return j >> 3, np.uint8(1 << (j & 7))
+
+
+def _blocks(targets, block_rows, n_parts=1):
+    """
+    Split the rows to be eliminated into blocks of at most block_rows rows,
+    bounding the size of the temporaries created by the elimination, and
+    into at least n_parts blocks, so that they can be shared among threads.
+    """
+    size = -(-len(targets) // n_parts)
+    if block_rows is not None:
+        size = min(size, block_rows)
+    if len(targets) <= size:
+        return [targets]
+    return [targets[i : i + size] for i in range(0, len(targets), size)]
+
+
+def _executor(n_threads):
+    """
+    A thread pool for the elimination, or None for a single thread.
+    """
+    if n_threads is None or n_threads <= 1:
+        return None
+    return ThreadPoolExecutor(n_threads)
+
+
+def _run(executor, task, blocks, n_bytes):
+    """
+    Apply task to every block, on the pool if the pivot touches enough
+    bytes to be worth sharing.
+    """
+    if executor is None or len(blocks) == 1 or n_bytes < PARALLEL_BYTES:
+        for block in blocks:
+            task(block)
+    else:
+        for future in [executor.submit(task, block) for block in blocks]:
+            future.result()
+
+
+def packed_rank(M, n_cols=None, block_rows=None, n_threads=1):
+    """
+    - Purpose: Find the rank over F2 of a bit packed matrix by Gaussian
+      elimination. The matrix is overwritten.
+    - Inputs:
+        - M (np.ndarray of shape (n, w), uint8): bit packed matrix. May be a
+          np.memmap.
+        - n_cols (int or None): number of columns to eliminate, defaults to
+          every bit of the rows.
+        - block_rows (int or None): if given, rows are eliminated in blocks
+          of this many rows, so that at most block_rows * w bytes of
+          temporaries are held in memory.
+        - n_threads (int): number of threads sharing the elimination of
+          each pivot column. The rows below the pivot are split into one
+          block per thread.
+    - Outputs:
+        - rank (int): the rank of the matrix.
+    """
+    return len(packed_pivots(M, n_cols, block_rows, n_threads))
+
+
+def packed_pivots(M, n_cols=None, block_rows=None, n_threads=1):
+    """
+    - Purpose: Bring a bit packed matrix to row echelon form, eliminating
+      the columns in order. The number of pivots before column j is the
+      rank of the first j columns, so one elimination gives the rank of
+      every prefix of the columns.
+    - Inputs:
+        - M, n_cols, block_rows, n_threads: see packed_rank.
+    - Outputs:
+        - pivots (np.ndarray of int): the pivot columns, in increasing order.
+    """
+    n_rows, width = M.shape
+    if n_cols is None:
+        n_cols = 8 * width
+    executor = _executor(n_threads)
+    try:
+        pivots = []
+        for j in range(n_cols):
+            if len(pivots) == n_rows:
+                break
+            rank = len(pivots)
+            byte, bit = j >> 3, np.uint8(1 << (j & 7))
+            hits = np.flatnonzero(M[rank:, byte] & bit)
+            if len(hits) == 0:
+                continue
+            pivot = rank + hits[0]
+            if pivot != rank:
+                M[[rank, pivot]] = M[[pivot, rank]]
+            targets = rank + hits[1:]
+            if len(targets):
+                pivot_row = M[rank, byte:]
+
+                def eliminate(block):
+                    M[block, byte:] ^= pivot_row
+
+                _run(
+                    executor,
+                    eliminate,
+                    _blocks(targets, block_rows, n_threads or 1),
+                    len(targets) * (width - byte),
+                )
+            pivots.append(j)
+        return np.array(pivots, dtype=np.int64)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def row_sum_signs(pivot, rows, pivot_sign, signs, width):
+    """
+    - Purpose: Vectorised version of supercliffords.otoc.row_sum, computing
+      the signs of many rows at once.
+    - Inputs:
+        - pivot (np.ndarray of shape (2 * width,), uint8): packed X|Z bits
+          of the row that was added.
+        - rows (np.ndarray of shape (n, 2 * width), uint8): packed X|Z bits
+          of the rows after the addition.
+        - pivot_sign (int): sign bit of the pivot row.
+        - signs (np.ndarray of shape (n,)): sign bits of the rows before the
+          addition.
+        - width (int): number of bytes of each half.
+    - Outputs:
+        - signs (np.ndarray of shape (n,), uint8): updated sign bits.
+    """
+    x1, z1 = pivot[:width], pivot[width:]
+    x2, z2 = rows[:, :width], rows[:, width:]
+    plus = (~x1 & z1 & x2 & ~z2) | (x1 & ~z1 & x2 & z2) | (x1 & z1 & ~x2 & z2)
+    minus = (~x1 & z1 & x2 & z2) | (x1 & ~z1 & ~x2 & z2) | (x1 & z1 & x2 & ~z2)
+    f = (
+        2 * signs.astype(np.int64)
+        + 2 * int(pivot_sign)
+        + popcount(plus)
+        - popcount(minus)
+    )
+    if np.any(f % 2):
+        raise ValueError("Error in row_sum operation")
+    return (f % 4 == 2).astype(np.uint8)
+
+
+def packed_ref(M, signs, N, block_rows=None, n_threads=1):
+    """
+    - Purpose: Packed equivalent of supercliffords.otoc.ref_binary. Brings a
+      stabilizer tableau to row echelon form, updating the signs with the
+      rowsum operation. Rows, pivots and signs agree exactly with
+      ref_binary.
+    - Inputs:
+        - M (np.ndarray of shape (N, 2W), uint8): packed X bits in the first
+          W = ceil(N / 8) bytes and packed Z bits in the last W bytes.
+          Overwritten with the row echelon form.
+        - signs (np.ndarray of shape (N,), uint8): sign bits, overwritten.
+        - N (int): number of qubits.
+        - block_rows (int or None): if given, rows are eliminated in blocks
+          of this many rows, see packed_rank.
+        - n_threads (int): number of threads sharing the elimination of
+          each pivot column, see packed_rank.
+    - Outputs:
+        - x_rank (int): number of pivots found in the X columns, i.e. the
+          rank of the X block of the row echelon form.
+    """
+    n_rows = M.shape[0]
+    width = packed_width(N)
+    executor = _executor(n_threads)
+    try:
+        current = 0
+        x_rank = 0
+        for j in range(2 * N):
+            if current == n_rows:
+                break
+            byte, bit = _column(j, width, N)
+            hits = np.flatnonzero(M[current:, byte] & bit)
+            if len(hits) == 0:
+                continue
+            pivot = current + hits[0]
+            if pivot != current:
+                M[[current, pivot]] = M[[pivot, current]]
+                signs[[current, pivot]] = signs[[pivot, current]]
+            targets = current + hits[1:]
+            if len(targets):
+                pivot_row = np.array(M[current])
+                pivot_sign = signs[current]
+
+                def eliminate(block):
+                    rows = M[block] ^ pivot_row
+                    M[block] = rows
+                    signs[block] = row_sum_signs(
+                        pivot_row, rows, pivot_sign, signs[block], width
+                    )
+
+                _run(
+                    executor,
+                    eliminate,
+                    _blocks(targets, block_rows, n_threads or 1),
+                    len(targets) * 2 * width,
+                )
+            current += 1
+            if j < N:
+                x_rank += 1
+        return x_rank
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def packed_to_sets(M):
+    """
+    - Purpose: Convert a sparse bit packed matrix to one set of column
+      indices per non-zero row, touching only its non-zero bytes.
+    - Inputs:
+        - M (np.ndarray of shape (n, w), uint8): bit packed matrix.
+    - Outputs:
+        - rows (list of set): the columns set in each non-zero row.
+    """
+    r, b = np.nonzero(M)
+    if len(r) == 0:
+        return []
+    bits = np.unpackbits(M[r, b][:, None], axis=1, bitorder="little")
+    hit, offset = np.nonzero(bits)
+    rows = r[hit]
+    cols = (8 * b[hit] + offset).tolist()
+    boundaries = np.flatnonzero(np.diff(rows)) + 1
+    starts = [0] + boundaries.tolist()
+    stops = boundaries.tolist() + [len(cols)]
+    return [set(cols[i:j]) for i, j in zip(starts, stops)]
+
+
+def sparse_rank(rows, max_fill=None):
+    """
+    - Purpose: Find the rank over F2 of a matrix given as sets of column
+      indices, by reducing each row against a basis keyed by leading column.
+    - Inputs:
+        - rows (list of set): the columns set in each row. Not modified.
+        - max_fill (int or None): give up once the basis holds more than
+          this many entries, as the matrix is then no longer sparse.
+    - Outputs:
+        - rank (int or None): the rank, or None if max_fill was exceeded.
+    """
+    basis = {}
+    fill = 0
+    for row in rows:
+        row = set(row)
+        while row:
+            lead = min(row)
+            if lead not in basis:
+                basis[lead] = row
+                fill += len(row)
+                break
+            row ^= basis[lead]
+        if max_fill is not None and fill > max_fill:
+            return None
+    return len(basis)
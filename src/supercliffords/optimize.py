@@ -0,0 +1,169 @@
+"""
+Module for compiling the gates generated by the steps of a circuit into a
+shorter stream of operations before they reach the simulator.
+
+A FusingSimulator stands in for a stim.TableauSimulator. Gates passed to its
+do method are not applied straight away: runs of single-qubit Cliffords on
+the same qubit, including across steps, are fused into one of the 24 named
+single-qubit Clifford gates of stim, identities (such as the I padding ops
+of the steps) are dropped, and everything else is buffered in order. The
+buffer is applied to the simulator in one call as soon as its state is
+read; it is kept as text, as appending to a stim.Circuit one gate at a time
+costs more than applying the gate.
+"""
+
+from collections import Counter
+
+import stim
+
+
+def _key(tableau):
+    return str(tableau.x_output(0)) + str(tableau.z_output(0))
+
+
+def _single_qubit_cliffords():
+    """
+    The named single-qubit Clifford gates of stim, keyed by their tableau.
+    """
+    names = {}
+    for name, data in stim.gate_data().items():
+        if data.is_single_qubit_gate and data.is_unitary:
+            names[_key(stim.Tableau.from_named_gate(name))] = name
+    return names
+
+
+# The 24 single-qubit Cliffords, which stim names individually.
+CLIFFORDS = _single_qubit_cliffords()
+
+SINGLE_QUBIT = frozenset(CLIFFORDS.values())
+
+# Targets per application of the two-qubit gates, for counting.
+_ARITY = {
+    name: 2
+    for name, data in stim.gate_data().items()
+    if data.is_two_qubit_gate
+}
+
+# Products of single-qubit Cliffords, filled on demand, see _fuse.
+_PRODUCTS = {}
+
+
+def _fuse(first, second):
+    """
+    The name of the single-qubit Clifford applying first, then second.
+    """
+    product = _PRODUCTS.get((first, second))
+    if product is None:
+        tableau = stim.Tableau.from_named_gate(first).then(
+            stim.Tableau.from_named_gate(second)
+        )
+        product = _PRODUCTS[first, second] = CLIFFORDS[_key(tableau)]
+    return product
+
+
+class FusingSimulator:
+    """
+    A stim.TableauSimulator that fuses single-qubit Cliffords and drops
+    identities before applying gates. Any method other than do is passed on
+    to the simulator, after applying the buffered gates.
+
+    params:
+        s (stim.TableauSimulator): the simulator to apply the gates to.
+        N (int): number of qubits; the simulator is grown to N qubits on the
+          first flush, as the dropped I padding ops would have done.
+    """
+
+    def __init__(self, s, N):
+        """
+        Initialize the simulator.
+        """
+        self.s = s
+        self.N = N
+        self.pending = {}
+        self.buffer = []
+        self.gates_in = Counter()
+        self.gates_out = Counter()
+
+    def _release(self, qubits):
+        """
+        Move the pending single-qubit gates of some qubits to the buffer.
+        """
+        for q in qubits:
+            name = self.pending.pop(q, "I")
+            if name != "I":
+                self.buffer.append(f"{name} {q}")
+                self.gates_out[name] += 1
+
+    def do(self, circuit):
+        """
+        Buffer the gates of a circuit.
+        params:
+            circuit (stim.Circuit): the gates.
+        """
+        text = str(circuit)
+        if "REPEAT" in text:
+            text = str(circuit.flattened())
+        pending = self.pending
+        for line in text.split("\n"):
+            name, _, targets = line.partition(" ")
+            targets = targets.split()
+            if name in SINGLE_QUBIT:
+                self.gates_in[name] += len(targets)
+                for q in targets:
+                    q = int(q)
+                    pending[q] = _fuse(pending.get(q, "I"), name)
+                continue
+            if not name:
+                continue
+            if all(q.isdigit() for q in targets):
+                self._release([int(q) for q in targets])
+            else:
+                # Measurement records, Pauli products, ...: keep it simple.
+                self._release(sorted(pending))
+            arity = _ARITY.get(name, 1)
+            self.gates_in[name] += len(targets) // arity
+            self.gates_out[name] += len(targets) // arity
+            self.buffer.append(line)
+
+    def flush(self):
+        """
+        Apply the buffered and pending gates to the simulator.
+        """
+        self._release(sorted(self.pending))
+        if self.s.num_qubits < self.N:
+            self.s.do(stim.Circuit(f"I {self.N - 1}"))
+        if self.buffer:
+            self.s.do(stim.Circuit("\n".join(self.buffer)))
+            self.buffer = []
+        return self.s
+
+    def copy(self):
+        """
+        A copy of the simulator, with the gates applied so far.
+        """
+        copy = FusingSimulator(self.flush().copy(), self.N)
+        copy.gates_in = Counter(self.gates_in)
+        copy.gates_out = Counter(self.gates_out)
+        return copy
+
+    def __getattr__(self, name):
+        """
+        Pass anything else (current_inverse_tableau, do_tableau, ...) on to
+        the simulator once it is up to date.
+        """
+        return getattr(self.flush(), name)
+
+    def report(self):
+        """
+        Gate counts before and after the optimisation.
+        returns:
+            report (dict): "in" and "out", Counters of the gates by name,
+            and "ratio", the fraction of the gates that were applied.
+        """
+        total_in = sum(self.gates_in.values())
+        total_out = sum(self.gates_out.values())
+        return {
+            "in": Counter(self.gates_in),
+            "out": Counter(self.gates_out),
+            "ratio": total_out / total_in if total_in else 1.0,
+        }
@@ -5,6 +5,8 @@ Module with functions used to compute the entropy.
 import stim
 import numpy as np
 import supercliffords.entropy as entropy
+from supercliffords.gf2 import packed_ref
+from supercliffords.context import inverse_tableau
 
 
 def ref_binary(A, signs, N):
@@ -148,20 +150,32 @@ def small_zs(bin_array, starting_row_index, N):
     return small_zs
 
 
-def compute_otoc(s, N, op_tableau):
+def compute_otoc(s, N, op_tableau, ctx=None):
     """
     Purpose: Compute the OTOC of a given circuit.
     Inputs:
-         - s (stim.TableauSimulator) - the circuit.
+         - s (stim.TableauSimulator) - the circuit, or a snapshot of it
+           taken with s.current_inverse_tableau().
          - op_tableau (stim.Tableau) - the operator.
          - N (int) - the number of qubits.
+         - ctx (supercliffords.context.MeasurementContext or None) - work
+           buffers to compute the OTOC in. If None, the dense reference
+           implementation is used.
 
     Outputs:
          - otoc (float) - the out-of-time-order correlator.
     """
-    tableau1: stim.Tableau = s.current_inverse_tableau() ** -1
-    tableau3: stim.Tableau = s.current_inverse_tableau()
+    tableau3: stim.Tableau = inverse_tableau(s)
+    tableau1: stim.Tableau = tableau3**-1
     tableau_tot: stim.Tableau = (tableau3 * op_tableau) * tableau1
+    if ctx is not None:
+        ctx.load_generators(tableau_tot)
+        rank = packed_ref(
+            ctx.work, ctx.signs, N, ctx.block_rows, ctx.n_threads
+        )
+        if any(ctx.signs[rank:N]):
+            return 0
+        return 2 ** (-rank / 2)
     n = len(tableau_tot)
     zs = [tableau_tot.z_output(k) for k in range(n)]
     zs_array = np.array(zs)
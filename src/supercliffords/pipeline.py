@@ -0,0 +1,102 @@
+"""
+Module for overlapping the evolution of a circuit with its measurements.
+
+A MeasurementPipeline takes snapshots of the tableau at measurement times and
+measures them on a pool of threads, while the caller keeps evolving the
+circuit. The GF(2) eliminations spend their time in NumPy kernels, which
+release the GIL, so measurement and evolution proceed concurrently.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from supercliffords.context import MeasurementContext
+
+
+class MeasurementPipeline:
+    """
+    Measures tableau snapshots on a pool of threads.
+
+    Each snapshot holds an N qubit tableau, about N^2 / 2 bytes, so at most
+    max_pending snapshots are kept: submit blocks until a measurement
+    finishes when the limit is reached.
+
+    params:
+        measure (callable): measure(snapshot, ctx) returning the value of
+          the observable, where snapshot is the stim.Tableau returned by
+          s.current_inverse_tableau() and ctx is a MeasurementContext owned
+          by the calling thread.
+        N (int): number of qubits.
+        n_threads (int): number of measurement threads.
+        max_pending (int or None): maximum number of snapshots waiting or
+          being measured. Defaults to 2 * n_threads.
+    """
+
+    def __init__(self, measure, N, n_threads=2, max_pending=None):
+        """
+        Start the threads.
+        """
+        self.measure = measure
+        self.N = N
+        self.n_threads = n_threads
+        self.max_pending = max_pending or 2 * n_threads
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(n_threads)
+        self._futures = []
+
+    def _context(self):
+        """
+        Return the measurement context of the current thread.
+        """
+        ctx = getattr(self._local, "ctx", None)
+        if ctx is None:
+            ctx = self._local.ctx = MeasurementContext(self.N)
+        return ctx
+
+    def _run(self, key, snapshot):
+        """
+        Measure a snapshot, releasing its slot once done.
+        """
+        try:
+            return key, self.measure(snapshot, self._context())
+        finally:
+            self._slots.release()
+
+    def submit(self, key, s):
+        """
+        Snapshot the current state of a circuit and queue its measurement.
+        params:
+            key: label returned with the result, e.g. the timestep.
+            s (stim.TableauSimulator): the circuit.
+        """
+        self._slots.acquire()
+        try:
+            snapshot = s.current_inverse_tableau()
+            future = self._executor.submit(self._run, key, snapshot)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._futures.append(future)
+
+    def results(self):
+        """
+        Wait for every queued measurement.
+        returns:
+            results (list of tuples): (key, value) for each submitted
+            snapshot, in order of submission.
+        """
+        futures, self._futures = self._futures, []
+        return [future.result() for future in futures]
+
+    def close(self):
+        """
+        Wait for the queued measurements and stop the threads.
+        """
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
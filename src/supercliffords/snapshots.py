@@ -0,0 +1,201 @@
+"""
+Module for saving and restoring the state of a circuit mid-evolution.
+
+A snapshot holds the bit packed inverse tableau of a stim.TableauSimulator,
+the state of the global NumPy random generator and the timestep it was taken
+at. Restoring a snapshot and continuing the evolution reproduces the
+uninterrupted run exactly, so runs can be extended to later times, and new
+observables evaluated on stored evolutions, without recomputing them.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import stim
+
+PLANES = ("x2x", "x2z", "z2x", "z2z", "x_signs", "z_signs")
+
+SNAPSHOT_FILE = re.compile(r"r(\d+)_t(\d+)\.npz$")
+
+
+class Snapshot:
+    """
+    The state of one realisation of a circuit after a given timestep.
+    params:
+        tableau (stim.Tableau): the inverse tableau of the circuit, as
+          returned by s.current_inverse_tableau().
+        stepcount (int): the last timestep applied.
+        rng_state (tuple): state of the global NumPy random generator, as
+          returned by np.random.get_state().
+        meta (dict or None): any further information to store.
+    """
+
+    def __init__(self, tableau, stepcount, rng_state, meta=None):
+        """
+        Initialize the snapshot.
+        """
+        self.tableau = tableau
+        self.stepcount = stepcount
+        self.rng_state = rng_state
+        self.meta = meta or {}
+
+    @property
+    def N(self):
+        """Number of qubits."""
+        return len(self.tableau)
+
+    @classmethod
+    def capture(cls, s, stepcount, meta=None):
+        """
+        Take a snapshot of a circuit.
+        params:
+            s (stim.TableauSimulator): the circuit.
+            stepcount (int): the last timestep applied to it.
+            meta (dict or None): any further information to store.
+        """
+        return cls(
+            s.current_inverse_tableau(), stepcount, np.random.get_state(), meta
+        )
+
+    def restore(self):
+        """
+        Restore the circuit and the global NumPy random generator.
+        returns:
+            s (stim.TableauSimulator): the circuit, ready to apply timestep
+            self.stepcount + 1.
+        """
+        s = stim.TableauSimulator()
+        s.set_inverse_tableau(self.tableau)
+        np.random.set_state(self.rng_state)
+        return s
+
+    def save(self, path):
+        """
+        Write the snapshot to a compressed .npz file.
+        """
+        planes = self.tableau.to_numpy(bit_packed=True)
+        name, keys, pos, has_gauss, cached_gaussian = self.rng_state
+        arrays = dict(zip(PLANES, planes))
+        arrays.update(
+            N=self.N,
+            stepcount=self.stepcount,
+            rng_name=name,
+            rng_keys=keys,
+            rng_pos=pos,
+            rng_has_gauss=has_gauss,
+            rng_cached_gaussian=cached_gaussian,
+            meta=json.dumps(self.meta),
+        )
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a snapshot written by Snapshot.save.
+        """
+        with np.load(path) as npz:
+            N = int(npz["N"])
+            planes = {plane: npz[plane] for plane in PLANES}
+            rng_state = (
+                str(npz["rng_name"]),
+                npz["rng_keys"],
+                int(npz["rng_pos"]),
+                int(npz["rng_has_gauss"]),
+                float(npz["rng_cached_gaussian"]),
+            )
+            stepcount = int(npz["stepcount"])
+            meta = json.loads(str(npz["meta"]))
+        tableau = stim.Tableau.from_numpy(**planes)
+        if len(tableau) != N:
+            raise ValueError(f"{path} holds {len(tableau)} qubits, not {N}")
+        return cls(tableau, stepcount, rng_state, meta)
+
+
+class SnapshotLibrary:
+    """
+    A directory of snapshots, one file per realisation and timestep.
+    params:
+        root (str): directory containing the library, created if missing.
+    """
+
+    def __init__(self, root):
+        """
+        Open (or create) a library.
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, realisation, stepcount):
+        return os.path.join(
+            self.root, f"r{realisation:05d}_t{stepcount:06d}.npz"
+        )
+
+    def index(self):
+        """
+        The snapshots in the library.
+        returns:
+            index (list of tuples): sorted (realisation, stepcount) pairs.
+        """
+        index = []
+        for file in os.listdir(self.root):
+            match = SNAPSHOT_FILE.match(file)
+            if match:
+                index.append((int(match.group(1)), int(match.group(2))))
+        return sorted(index)
+
+    def save(self, realisation, snapshot):
+        """
+        Add a snapshot of a realisation to the library.
+        """
+        snapshot.save(self.path(realisation, snapshot.stepcount))
+
+    def load(self, realisation, stepcount):
+        return Snapshot.load(self.path(realisation, stepcount))
+
+    def latest(self, realisation, before=None):
+        """
+        The latest snapshot of a realisation.
+        params:
+            realisation (int): index of the realisation.
+            before (int or None): only consider snapshots taken before this
+              timestep.
+        returns:
+            snapshot (Snapshot or None): None if there is no such snapshot.
+        """
+        steps = [
+            stepcount
+            for r, stepcount in self.index()
+            if r == realisation and (before is None or stepcount < before)
+        ]
+        if not steps:
+            return None
+        return self.load(realisation, max(steps))
+
+    def evaluate(self, measure, ctx=None):
+        """
+        Evaluate an observable on every snapshot in the library.
+        params:
+            measure (callable): measure(tableau, ctx) returning the value of
+              the observable, where tableau is the inverse tableau of the
+              snapshot. See supercliffords.pipeline.MeasurementPipeline.
+            ctx (supercliffords.context.MeasurementContext or None): work
+              buffers passed to measure.
+        returns:
+            values (np.array): values of shape (realisations, len(ts)), NaN
+            where a realisation has no snapshot at that timestep.
+            ts (np.array): timesteps of the snapshots.
+        """
+        index = self.index()
+        realisations = sorted({r for r, _ in index})
+        ts = np.array(sorted({stepcount for _, stepcount in index}))
+        values = np.full((len(realisations), len(ts)), np.nan)
+        for r, stepcount in index:
+            snapshot = self.load(r, stepcount)
+            values[realisations.index(r), np.searchsorted(ts, stepcount)] = (
+                measure(snapshot.tableau, ctx)
+            )
+        return values, ts
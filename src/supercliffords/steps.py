@@ -106,6 +106,17 @@ class Initialize(Step):
         assert set(counter.keys()) <= set(["X", "Y"])
         return op_string
 
+    def frame(self):
+        """
+        Purpose: The Pauli operator applied by the step.
+        Outputs:
+            - frame (stim.PauliString) - X on the qubits where op_string is
+              "Y", identity elsewhere.
+        """
+        return stim.PauliString(
+            "".join("X" if letter == "Y" else "_" for letter in self.op_string)
+        )
+
     def apply(self, s, step_count):
         """
         Apply the step.
@@ -248,3 +259,89 @@ class StepSequence:
         for step in self.steps:
             s = step.apply(s, step_count)
         return s
+
+
+class FloquetStep(Step):
+    """
+    Step that freezes the random layers of a sequence of steps, so that the
+    same unitary is applied in every period.
+
+    At step 0 of each realisation, the layers that steps would apply at the
+    step counts 1, ..., period are drawn (from the global NumPy random
+    generator, as the steps would) and recorded as tableaus, and the steps
+    are applied at step 0 as usual. Step count k > 0 then applies the
+    recorded layer ((k - 1) % period) + 1.
+
+    params:
+        N (int): The number of qubits in the circuit.
+        steps (supercliffords.StepSequence): The steps to freeze.
+        period (int): The number of steps in a period.
+    """
+
+    def __init__(self, N, steps, period=1):
+        """
+        Initialize the step.
+        """
+        super().__init__(N, when="always")
+        self.steps = steps
+        self.period = period
+        self.initial = None
+        self.layers = None
+
+    def record(self, step_count):
+        """
+        Purpose: Record the unitary applied by the steps at one step count.
+        Outputs:
+            - tableau (stim.Tableau) - the unitary, on N qubits.
+        """
+        s = stim.TableauSimulator()
+        c = stim.Circuit()
+        c.append_operation("I", [self.N - 1])
+        s.do(c)
+        s = self.steps.apply(s, step_count)
+        return s.current_inverse_tableau() ** -1
+
+    def draw(self):
+        """
+        Purpose: Draw and record a new set of layers.
+        """
+        self.initial = self.record(0)
+        self.layers = [self.record(k) for k in range(1, self.period + 1)]
+
+    def evolution(self, step_count):
+        """
+        Purpose: The unitary applied by steps 0, ..., step_count, computed
+          with O(log(step_count)) tableau compositions.
+        Inputs:
+            - step_count (int) - the last step applied.
+        Outputs:
+            - tableau (stim.Tableau) - the unitary.
+        """
+        if self.layers is None:
+            raise ValueError("no layers recorded, call draw first")
+        periods, rest = divmod(step_count, self.period)
+        # stim raises tableaus to integer powers by repeated squaring.
+        tableau = self.initial.then(self.period_tableau() ** periods)
+        for layer in self.layers[:rest]:
+            tableau = tableau.then(layer)
+        return tableau
+
+    def period_tableau(self):
+        """
+        Purpose: The unitary applied over one period.
+        """
+        tableau = stim.Tableau(self.N)
+        for layer in self.layers:
+            tableau = tableau.then(layer)
+        return tableau
+
+    def apply(self, s, step_count):
+        """
+        Apply the step.
+        """
+        if step_count == 0:
+            self.draw()
+            return self.steps.apply(s, 0)
+        layer = self.layers[(step_count - 1) % self.period]
+        s.do_tableau(layer, list(range(self.N)))
+        return s
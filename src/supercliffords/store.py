@@ -0,0 +1,376 @@
+"""
+Module for storing simulation results in a compact binary format.
+
+A store is a directory containing one sub-directory per dataset. Each dataset
+holds per-realisation trajectories as a sequence of ``.npy`` chunks (int16
+for entropies, float32 for everything else) and a ``meta.json`` sidecar
+recording the parameters of the run. Chunks are memory-mapped when read, so
+opening a dataset costs only the time taken to parse its sidecar.
+"""
+
+import csv
+import json
+import os
+import re
+from importlib import metadata
+
+import numpy as np
+
+META_FILE = "meta.json"
+
+# System sizes of the legacy files whose names do not contain N.
+LEGACY_SYSTEM_SIZES = {"fig4": 120, "fig5_left": 1000}
+
+# Number of realisations averaged over in the legacy files storing means.
+LEGACY_REALISATIONS = {
+    "entropy_data": 500,
+    "fig4": 1000,
+    "fig5_right": 250,
+}
+
+
+def code_version():
+    """
+    - Purpose: Return the version of the installed supercliffords package.
+    - Outputs:
+        - version (str): the package version, or "unknown" if the package is
+          not installed.
+    """
+    try:
+        return metadata.version("supercliffords")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _write_json(path, obj):
+    """
+    - Purpose: Atomically write a json file, so that concurrent readers never
+      see a partially written sidecar.
+    - Inputs:
+        - path (str): location of the file.
+        - obj (dict): object to serialise.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=1)
+    os.replace(tmp, path)
+
+
+def choose_dtype(kind, values=None):
+    """
+    - Purpose: Choose the storage dtype for a dataset.
+    - Inputs:
+        - kind (str): the observable stored, e.g. "entropy" or "otoc".
+        - values (np.ndarray or None): data that will be stored, if known.
+    - Outputs:
+        - dtype (str): "int16" for integer entropies, otherwise "float32".
+    """
+    if kind != "entropy":
+        return "float32"
+    if values is None:
+        return "int16"
+    values = np.asarray(values)
+    if (
+        np.all(np.isfinite(values))
+        and np.all(values == np.round(values))
+        and np.all(np.abs(values) <= np.iinfo(np.int16).max)
+    ):
+        return "int16"
+    return "float32"
+
+
+class Dataset:
+    """
+    A collection of trajectories of equal length, stored as chunks on disk.
+    params:
+        path (str): directory containing the dataset.
+    """
+
+    def __init__(self, path):
+        """
+        Open an existing dataset.
+        """
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+
+    @property
+    def length(self):
+        """Number of timesteps in each trajectory."""
+        return self.meta["length"]
+
+    @property
+    def dtype(self):
+        """Storage dtype of the trajectories."""
+        return np.dtype(self.meta["dtype"])
+
+    def __len__(self):
+        """
+        Number of trajectories stored.
+        """
+        return sum(chunk["rows"] for chunk in self.meta["chunks"])
+
+    def chunks(self):
+        """
+        Lazily iterate over the stored chunks.
+        returns:
+            generator of memory-mapped arrays of shape (rows, length).
+        """
+        for chunk in self.meta["chunks"]:
+            yield np.load(
+                os.path.join(self.path, chunk["file"]), mmap_mode="r"
+            )
+
+    def array(self):
+        """
+        Read every trajectory into memory.
+        returns:
+            data (np.ndarray): array of shape (len(self), length).
+        """
+        if len(self) == 0:
+            return np.zeros((0, self.length), dtype=self.dtype)
+        return np.concatenate(list(self.chunks()), axis=0)
+
+    def __getitem__(self, index):
+        """
+        Read a single trajectory, touching only the chunk it lives in.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trajectory index out of range")
+        for chunk, info in zip(self.chunks(), self.meta["chunks"]):
+            if index < info["rows"]:
+                return np.array(chunk[index])
+            index -= info["rows"]
+
+    def mean(self):
+        """
+        Average the trajectories chunk by chunk.
+        returns:
+            mean (np.ndarray): array of length self.length.
+        """
+        total = np.zeros(self.length)
+        for chunk in self.chunks():
+            total += chunk.sum(axis=0, dtype=np.float64)
+        return total / max(len(self), 1)
+
+    @property
+    def seeds(self):
+        """Seeds of the stored realisations (None where unknown)."""
+        return self.meta.get("seeds", [])
+
+    def append(self, rows, seeds=None):
+        """
+        Append trajectories to the dataset.
+        params:
+            rows (np.ndarray): array of shape (n, length), or a single
+              trajectory of shape (length,).
+            seeds (list or None): seeds of the appended realisations.
+        """
+        rows = np.atleast_2d(np.asarray(rows))
+        if rows.shape[1] != self.length:
+            raise ValueError(
+                f"trajectories must have length {self.length}, "
+                f"got {rows.shape[1]}"
+            )
+        if seeds is None:
+            seeds = [None] * len(rows)
+        if len(seeds) != len(rows):
+            raise ValueError("need one seed per appended trajectory")
+        if self.dtype == np.int16 and not np.all(rows == np.round(rows)):
+            raise ValueError("int16 datasets can only store integer values")
+        chunk_rows = self.meta["chunk_rows"]
+        for start in range(0, len(rows), chunk_rows):
+            block = rows[start : start + chunk_rows].astype(self.dtype)
+            name = f"chunk_{len(self.meta['chunks']):06d}.npy"
+            np.save(os.path.join(self.path, name), block)
+            self.meta["chunks"].append({"file": name, "rows": len(block)})
+        self.meta["seeds"] = self.seeds + list(seeds)
+        _write_json(os.path.join(self.path, META_FILE), self.meta)
+
+
+class ResultStore:
+    """
+    A directory of datasets.
+    params:
+        root (str): directory containing the store, created if missing.
+    """
+
+    def __init__(self, root):
+        """
+        Open (or create) a store.
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def names(self):
+        """
+        Names of the datasets in the store, relative to the root.
+        """
+        names = []
+        for dirpath, _, files in os.walk(self.root):
+            if META_FILE in files:
+                names.append(os.path.relpath(dirpath, self.root))
+        return sorted(names)
+
+    def __contains__(self, name):
+        return os.path.exists(os.path.join(self.root, name, META_FILE))
+
+    def open(self, name):
+        """
+        Open an existing dataset.
+        """
+        if name not in self:
+            raise KeyError(f"no dataset named {name!r} in {self.root}")
+        return Dataset(os.path.join(self.root, name))
+
+    def create(
+        self,
+        name,
+        length,
+        kind,
+        N,
+        slow=None,
+        cut=None,
+        seed=None,
+        dtype=None,
+        chunk_rows=256,
+        **extra,
+    ):
+        """
+        Create an empty dataset.
+        params:
+            name (str): name of the dataset (may contain "/").
+            length (int): number of timesteps in each trajectory.
+            kind (str): observable stored, e.g. "entropy" or "otoc".
+            N (int): number of qubits.
+            slow (int or None): the slow parameter of the circuit.
+            cut (int or None): cut used for entropy calculations.
+            seed (int or None): seed of the run, if a single one was used.
+            dtype (str or None): storage dtype, see choose_dtype.
+            chunk_rows (int): maximum number of trajectories per chunk.
+            extra: any further metadata to store in the sidecar.
+        returns:
+            dataset (Dataset): the new dataset.
+        """
+        if name in self:
+            raise FileExistsError(f"dataset {name!r} already exists")
+        path = os.path.join(self.root, name)
+        os.makedirs(path, exist_ok=True)
+        meta = {
+            "kind": kind,
+            "N": N,
+            "slow": slow,
+            "cut": cut,
+            "seed": seed,
+            "code_version": code_version(),
+            "length": int(length),
+            "dtype": dtype or choose_dtype(kind),
+            "chunk_rows": int(chunk_rows),
+            "chunks": [],
+            "seeds": [],
+        }
+        meta.update(extra)
+        _write_json(os.path.join(path, META_FILE), meta)
+        return Dataset(path)
+
+    def require(self, name, length, kind, N, **kwargs):
+        """
+        Open a dataset, creating it first if it does not exist.
+        """
+        if name in self:
+            return self.open(name)
+        return self.create(name, length, kind, N, **kwargs)
+
+
+def _lookup(table, parts):
+    """
+    Return the entry of table for the first path component found in it.
+    """
+    for part in parts:
+        if part in table:
+            return table[part]
+    return None
+
+
+def read_legacy(path):
+    """
+    - Purpose: Read one of the legacy ``.csv``/``.npz`` files from ``data/``.
+    - Inputs:
+        - path (str): location of the file.
+    - Outputs:
+        - data (np.ndarray): array of shape (rows, length). Files storing an
+          average over realisations have a single row.
+        - meta (dict): metadata inferred from the location of the file.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            next(reader)  # header row written by pandas.
+            data = np.array([[float(x) for x in row] for row in reader if row])
+        aggregate = "realisations"
+    elif path.endswith(".npz"):
+        with np.load(path) as npz:
+            data = np.atleast_2d(npz[npz.files[0]])
+        aggregate = "mean"
+    else:
+        raise ValueError(f"unsupported legacy file {path}")
+
+    parts = os.path.normpath(path).split(os.sep)
+    match = re.match(r"N(\d+)$", os.path.splitext(parts[-1])[0])
+    if match:
+        N = int(match.group(1))
+    else:
+        N = _lookup(LEGACY_SYSTEM_SIZES, parts)
+    kind = "otoc" if "otoc_data" in parts else "entropy"
+    meta = {
+        "kind": kind,
+        "N": N,
+        "cut": N // 4 if (kind == "entropy" and N) else None,
+        "aggregate": aggregate,
+        "source": os.path.basename(path),
+    }
+    if aggregate == "mean":
+        meta["realisations"] = _lookup(LEGACY_REALISATIONS, parts)
+    return data, meta
+
+
+def convert_legacy(data_dir, store):
+    """
+    - Purpose: Convert the legacy data directory into a results store.
+    - Inputs:
+        - data_dir (str): directory containing the legacy data, e.g. "data".
+        - store (ResultStore): store to write the converted datasets into.
+    - Outputs:
+        - names (list of str): names of the datasets that were written.
+          Datasets already present in the store are left untouched.
+    """
+    names = []
+    for dirpath, _, files in os.walk(data_dir):
+        for file in sorted(files):
+            if not file.endswith((".csv", ".npz")):
+                continue
+            path = os.path.join(dirpath, file)
+            name = os.path.splitext(os.path.relpath(path, data_dir))[0]
+            if name in store:
+                continue
+            data, meta = read_legacy(path)
+            dataset = store.create(
+                name,
+                data.shape[1],
+                dtype=choose_dtype(meta["kind"], data),
+                **meta,
+            )
+            dataset.append(data)
+            names.append(name)
+    return sorted(names)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m supercliffords.store DATA_DIR STORE_DIR")
+    for name in convert_legacy(sys.argv[1], ResultStore(sys.argv[2])):
+        print(name)
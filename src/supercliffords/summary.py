@@ -0,0 +1,252 @@
+"""
+Module for building a pre-aggregated summary index of the result datasets.
+
+The index is a single ``.npz`` file holding, for every dataset found in the
+data directories, the mean, standard error and quantile curves together with
+the (kind, N, slow, cut) parameters of the run and a hash of the files it was
+computed from. Rebuilding only re-reads datasets whose hash has changed.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from supercliffords.store import META_FILE, Dataset, read_legacy
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+INDEX_KEY = "__index__"
+
+
+def file_hash(paths):
+    """
+    - Purpose: Hash the contents of a group of files.
+    - Inputs:
+        - paths (list of str): files to hash, in order.
+    - Outputs:
+        - digest (str): hex sha256 digest of the concatenated contents.
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def find_sources(data_dir):
+    """
+    - Purpose: Find every dataset below a data directory.
+    - Inputs:
+        - data_dir (str): a legacy data directory or a results store.
+    - Outputs:
+        - sources (list of tuples): (name, files, loader) for each dataset,
+          where loader() returns (data, meta) with data of shape
+          (rows, length).
+    """
+    sources = []
+    for dirpath, dirs, files in os.walk(data_dir):
+        if META_FILE in files:
+            dataset = Dataset(dirpath)
+            chunk_files = [
+                os.path.join(dirpath, c["file"])
+                for c in dataset.meta["chunks"]
+            ]
+            sources.append(
+                (
+                    os.path.relpath(dirpath, data_dir),
+                    [os.path.join(dirpath, META_FILE)] + chunk_files,
+                    lambda d=dataset: (d.array(), d.meta),
+                )
+            )
+            dirs.clear()
+            continue
+        for file in sorted(files):
+            if file.endswith((".csv", ".npz")):
+                path = os.path.join(dirpath, file)
+                name = os.path.splitext(os.path.relpath(path, data_dir))[0]
+                sources.append((name, [path], lambda p=path: read_legacy(p)))
+    return sources
+
+
+def summarise(data, meta, quantiles=QUANTILES):
+    """
+    - Purpose: Compute the summary curves of a dataset.
+    - Inputs:
+        - data (np.ndarray): array of shape (rows, length).
+        - meta (dict): metadata of the dataset.
+        - quantiles (tuple of float): quantiles to compute.
+    - Outputs:
+        - curves (dict): "mean", "sem" and "quantiles" arrays. If the data
+          is already an average over realisations, the standard error and
+          quantiles are not available and are filled with NaN.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    rows, length = data.shape
+    mean = data.mean(axis=0)
+    if meta.get("aggregate") == "mean" or rows < 2:
+        sem = np.full(length, np.nan)
+        qs = np.full((len(quantiles), length), np.nan)
+    else:
+        sem = data.std(axis=0, ddof=1) / np.sqrt(rows)
+        qs = np.quantile(data, quantiles, axis=0)
+    return {"mean": mean, "sem": sem, "quantiles": qs}
+
+
+class SummaryIndex:
+    """
+    A summary index, mapping dataset names to their summary curves.
+    params:
+        entries (dict): name -> entry dict with keys "kind", "N", "slow",
+          "cut", "realisations", "hash", "mean", "sem", "quantiles".
+        quantiles (tuple of float): the quantiles stored in the index.
+    """
+
+    def __init__(self, entries, quantiles=QUANTILES):
+        """
+        Initialize the index.
+        """
+        self.entries = entries
+        self.quantiles = tuple(quantiles)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index written by SummaryIndex.save.
+        """
+        with np.load(path) as npz:
+            header = json.loads(str(npz[INDEX_KEY]))
+            entries = {}
+            for i, (name, info) in enumerate(header["entries"].items()):
+                entry = dict(info)
+                for stat in ("mean", "sem", "quantiles"):
+                    entry[stat] = npz[f"{i}/{stat}"]
+                entries[name] = entry
+        return cls(entries, header["quantiles"])
+
+    def save(self, path):
+        """
+        Write the index to a single .npz file.
+        """
+        header = {"quantiles": list(self.quantiles), "entries": {}}
+        arrays = {}
+        for i, (name, entry) in enumerate(self.entries.items()):
+            header["entries"][name] = {
+                k: v
+                for k, v in entry.items()
+                if k not in ("mean", "sem", "quantiles")
+            }
+            for stat in ("mean", "sem", "quantiles"):
+                arrays[f"{i}/{stat}"] = entry[stat]
+        arrays[INDEX_KEY] = np.array(json.dumps(header))
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    def names(self):
+        return sorted(self.entries)
+
+    def __getitem__(self, name):
+        return self.entries[name]
+
+    def query(self, kind=None, N=None, slow=None, cut=None):
+        """
+        Find the entries matching the given parameters.
+        params:
+            kind, N, slow, cut: values to match. None matches anything.
+        returns:
+            matches (dict): name -> entry for each matching dataset.
+        """
+        criteria = {"kind": kind, "N": N, "slow": slow, "cut": cut}
+        return {
+            name: entry
+            for name, entry in sorted(self.entries.items())
+            if all(
+                value is None or entry[key] == value
+                for key, value in criteria.items()
+            )
+        }
+
+    def curve(self, name, stat="mean", q=None):
+        """
+        Return one summary curve of a dataset.
+        params:
+            name (str): name of the dataset.
+            stat (str): "mean", "sem" or "quantile".
+            q (float): the quantile, when stat is "quantile".
+        """
+        entry = self.entries[name]
+        if stat == "quantile":
+            return entry["quantiles"][self.quantiles.index(q)]
+        return entry[stat]
+
+    def stale(self, data_dirs):
+        """
+        Names of the datasets whose files changed (or appeared, or were
+        removed) since the index was built.
+        """
+        current = {}
+        for data_dir in data_dirs:
+            for name, files, _ in find_sources(data_dir):
+                current[name] = file_hash(files)
+        names = set(current) | set(self.entries)
+        return sorted(
+            name
+            for name in names
+            if current.get(name) != self.entries.get(name, {}).get("hash")
+        )
+
+
+def build_summary(data_dirs, index_path=None, quantiles=QUANTILES):
+    """
+    - Purpose: Build (or refresh) the summary index of some data directories.
+    - Inputs:
+        - data_dirs (list of str): legacy data directories or result stores.
+        - index_path (str or None): where the index is kept. If the file
+          exists, entries whose hash is unchanged are reused.
+        - quantiles (tuple of float): quantiles to compute.
+    - Outputs:
+        - index (SummaryIndex): the up-to-date index.
+    """
+    old = {}
+    if index_path is not None and os.path.exists(index_path):
+        previous = SummaryIndex.load(index_path)
+        if previous.quantiles == tuple(quantiles):
+            old = previous.entries
+
+    entries = {}
+    for data_dir in data_dirs:
+        for name, files, loader in find_sources(data_dir):
+            digest = file_hash(files)
+            if name in old and old[name]["hash"] == digest:
+                entries[name] = old[name]
+                continue
+            data, meta = loader()
+            entry = summarise(data, meta, quantiles)
+            entry.update(
+                {
+                    "kind": meta.get("kind"),
+                    "N": meta.get("N"),
+                    "slow": meta.get("slow"),
+                    "cut": meta.get("cut"),
+                    "realisations": meta.get("realisations", len(data)),
+                    "hash": digest,
+                }
+            )
+            entries[name] = entry
+
+    index = SummaryIndex(entries, quantiles)
+    if index_path is not None:
+        index.save(index_path)
+    return index
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3:
+        sys.exit("usage: python -m supercliffords.summary INDEX DATA_DIR...")
+    index = build_summary(sys.argv[2:], sys.argv[1])
+    print(f"{len(index.entries)} datasets indexed in {sys.argv[1]}")
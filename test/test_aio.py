@@ -0,0 +1,46 @@
+import asyncio
+import numpy as np
+import stim
+from supercliffords.aio import iterate_measurements
+from supercliffords.circuits import ThreeQuarterCircuit
+from supercliffords.entropy import compute_entropy
+
+
+def test_async_drivers_match_blocking():
+    N = 16
+    circuit = ThreeQuarterCircuit(N, 2)
+    op = stim.TableauSimulator()
+    op.do(stim.Circuit(f"I {N - 1}\nH 3"))
+
+    async def main():
+        return await asyncio.gather(
+            circuit.compute_entropy_async(10, 4, 2, 2, seed=1),
+            circuit.compute_entropy_async(10, 4, 2, 2, seed=2),
+            circuit.compute_otoc_async(10, 2, 2, op, seed=3),
+        )
+
+    (S1, ts), (S2, _), (f, _) = asyncio.run(main())
+    assert np.array_equal(ts, [0, 2, 4, 6, 8])
+    assert np.array_equal(S1, circuit.compute_entropy(10, 4, 2, 2, seed=1)[0])
+    assert np.array_equal(S2, circuit.compute_entropy(10, 4, 2, 2, seed=2)[0])
+    assert np.array_equal(f, circuit.compute_otoc(10, 2, 2, op, seed=3)[0])
+
+
+def test_stream_cancellation():
+    circuit = ThreeQuarterCircuit(16, 2)
+
+    def measure(s, ctx):
+        return compute_entropy(s, 4, ctx)
+
+    async def main():
+        items = []
+        stream = iterate_measurements(circuit, 1000, 1, 1, measure, seed=0)
+        async for item in stream:
+            items.append(item)
+            if len(items) == 3:
+                break
+        await stream.aclose()
+        return items
+
+    items = asyncio.run(main())
+    assert [stepcount for _, stepcount, _ in items] == [0, 1, 2]
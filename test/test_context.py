@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pytest
+import stim
+from supercliffords.circuits import ThreeQuarterCircuit
+from supercliffords.context import MeasurementContext, OutOfCoreContext
+from supercliffords.entropy import compute_entropy
+from supercliffords.gates import C3
+from supercliffords.otoc import compute_otoc
+
+
+def test_buffers():
+    ctx = MeasurementContext(20)
+    assert ctx.zs.dtype == np.uint8
+    assert ctx.zs.shape == (20, 6)
+    assert ctx.nbytes == 2 * 20 * 6 + 20
+    assert MeasurementContext.peak_bytes(20) > ctx.nbytes
+    with pytest.raises(ValueError):
+        ctx.load_stabilizers(stim.TableauSimulator())
+
+
+def test_matches_reference():
+    N = 24
+    circuit = ThreeQuarterCircuit(N, 2)
+    op = stim.TableauSimulator()
+    op.do(stim.Circuit(f"I {N - 1}"))
+    op.do(C3(0, 1, 2))
+    op = op.current_inverse_tableau() ** -1
+    ctx = MeasurementContext(N)
+    s = stim.TableauSimulator()
+    for stepcount in range(20):
+        s = circuit.steps.apply(s, stepcount)
+        for cut in [1, 7, 8, 12]:
+            assert compute_entropy(s, cut, ctx) == compute_entropy(s, cut)
+        assert compute_otoc(s, N, op, ctx) == compute_otoc(s, N, op)
+
+
+def test_sparse_and_dense_elimination():
+    N = 40
+    circuit = ThreeQuarterCircuit(N, 1)
+    sparse, dense = MeasurementContext(N), MeasurementContext(N)
+    sparse.sparse_density = 1.0
+    dense.sparse_density = 0.0
+    s = stim.TableauSimulator()
+    for stepcount in range(12):
+        s = circuit.steps.apply(s, stepcount)
+        for cut in [3, 10, 20]:
+            assert compute_entropy(s, cut, sparse) == compute_entropy(
+                s, cut, dense
+            )
+
+
+def test_out_of_core(tmp_path):
+    N = 40
+    circuit = ThreeQuarterCircuit(N, 2)
+    ctx = OutOfCoreContext(N, str(tmp_path), block_rows=3)
+    assert isinstance(ctx.work, np.memmap)
+    assert (tmp_path / "work.bin").exists()
+    dense = MeasurementContext(N)
+    s = stim.TableauSimulator()
+    for stepcount in range(15):
+        s = circuit.steps.apply(s, stepcount)
+        for cut in [5, 10, 21]:
+            assert compute_entropy(s, cut, ctx) == compute_entropy(
+                s, cut, dense
+            )
+
+    temporary = OutOfCoreContext(N)
+    directory = temporary.directory
+    assert compute_entropy(s, 10, temporary) == compute_entropy(s, 10, dense)
+    temporary.close()
+    assert not os.path.exists(directory)
@@ -0,0 +1,54 @@
+import numpy as np
+from supercliffords.circuits import ThreeQuarterCircuit
+from supercliffords.costmodel import CostModel, fit_power_law, peak_bytes
+
+
+def test_fit_power_law():
+    sizes = np.array([10, 20, 40])
+    a, b = fit_power_law(sizes, 3e-6 * sizes**2.5)
+    assert np.isclose(a, 3e-6) and np.isclose(b, 2.5)
+
+
+def test_estimate_and_pack(tmp_path):
+    model = CostModel(
+        {"ThreeQuarterCircuit/evolve": (1e-3, 1.0), "entropy": (1e-4, 2.0)}
+    )
+    cost = model.estimate(ThreeQuarterCircuit, 10, 8, 2, 4, n_jobs=2)
+    per_rep = 8 * 1e-2 + 4 * 1e-2
+    assert np.isclose(cost["cpu_time"], 4 * per_rep)
+    assert np.isclose(cost["wall_time"], 2 * per_rep)
+    assert cost["peak_bytes"] == 2 * peak_bytes(10)
+    assert np.isclose(
+        model.estimate("ThreeQuarterCircuit", 10, 8, 2, 1, slow=4)["cpu_time"],
+        8 * 5e-3 + 4 * 1e-2,
+    )
+
+    jobs = [
+        {
+            "circuit_cls": ThreeQuarterCircuit,
+            "N": N,
+            "t": 8,
+            "res": 2,
+            "rep": 1,
+        }
+        for N in (10, 40, 20, 30)
+    ]
+    bins, loads = model.pack(jobs, 2)
+    assert sorted(sum(bins, [])) == [0, 1, 2, 3]
+    assert bins[0][0] == 1 and bins[1][0] == 3
+
+    path = str(tmp_path / "model.json")
+    model.save(path)
+    assert CostModel.load(path).fits == model.fits
+
+
+def test_calibrate():
+    model = CostModel.calibrate([ThreeQuarterCircuit], sizes=(16, 32))
+    assert set(model.fits) == {
+        "ThreeQuarterCircuit/evolve",
+        "entropy",
+        "otoc",
+        "reference_entropy",
+        "reference_otoc",
+    }
+    assert model.predict("entropy", 64) > 0
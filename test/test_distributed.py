@@ -0,0 +1,44 @@
+import os
+from multiprocessing import Process
+import numpy as np
+from supercliffords.circuits import ThreeQuarterCircuit
+from supercliffords.distributed import TaskQueue, run_worker
+
+
+def test_queue_with_workers(tmp_path):
+    root = str(tmp_path / "queue")
+    queue = TaskQueue(root)
+    circuit = ThreeQuarterCircuit(16, 2)
+    args = (8, 4, 2, 1)
+    ids = queue.submit(circuit, "compute_entropy", args, range(5), chunk=2)
+    assert len(ids) == 3
+    assert queue.submit(circuit, "compute_entropy", args, range(5), 2) == ids
+    assert queue.status()["tasks"] == 3
+
+    workers = [
+        Process(target=run_worker, args=(root, 0.05, 0.5)) for _ in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    values, ts, seeds = queue.gather(ids, poll=0.05, timeout=60)
+    for worker in workers:
+        worker.join()
+    assert queue.status() == {"tasks": 0, "claimed": 0, "results": 3}
+    assert list(seeds) == [0, 1, 2, 3, 4]
+    for seed, row in zip(seeds, values):
+        expected, _ = circuit.compute_entropy(*args, seed=int(seed))
+        assert np.array_equal(row, expected)
+
+
+def test_requeue(tmp_path):
+    queue = TaskQueue(str(tmp_path))
+    circuit = ThreeQuarterCircuit(16, 2)
+    (task_id,) = queue.submit(circuit, "compute_entropy", (4, 4, 2, 1), [7])
+    task = queue.claim()
+    assert task["id"] == task_id and queue.claim() is None
+    claimed = os.path.join(str(tmp_path), "claimed", task_id + ".pkl")
+    os.utime(claimed, (0, 0))
+    assert queue.requeue(60) == [task_id]
+    assert run_worker(str(tmp_path), idle_timeout=0) == 1
+    values, ts, seeds = queue.gather([task_id])
+    assert values.shape == (1, 2)
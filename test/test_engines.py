@@ -0,0 +1,48 @@
+import pytest
+import stim
+from supercliffords.engines import (
+    ENGINES,
+    Engine,
+    autotune,
+    canonical_entropies,
+    check,
+    register,
+    select,
+)
+from supercliffords.entropy import compute_entropy
+
+
+def test_engines_conform():
+    for name in ENGINES:
+        assert check(name) == []
+
+
+def test_canonical_entropies():
+    s = stim.TableauSimulator()
+    s.set_inverse_tableau(stim.Tableau.random(10))
+    S = canonical_entropies(s)
+    assert S[0] == S[10] == 0
+    for cut in range(1, 10):
+        assert S[cut] == compute_entropy(s, cut)
+
+
+def test_check_detects_wrong_engine():
+    wrong = Engine("wrong", entropy=lambda s, cut, ctx: 0)
+    assert check(wrong, sizes=(8,), samples=1)
+    with pytest.raises(KeyError):
+        check("missing")
+
+
+def test_autotune_and_select(tmp_path):
+    path = str(tmp_path / "engines.json")
+    register(Engine("wrong", entropy=lambda s, cut, ctx: 0))
+    try:
+        choices = autotune(sizes=(16, 32), repeats=1, path=path)
+    finally:
+        del ENGINES["wrong"]
+    assert [N for N, _ in choices["entropy"]] == [16, 32]
+    assert all(name != "wrong" for _, name in choices["entropy"])
+    assert choices["otoc"][0][1] in ("reference", "packed", "threaded")
+    assert select("otoc", 20, path).name == choices["otoc"][0][1]
+    assert select("entropy", 8, path).name == choices["entropy"][0][1]
+    assert select("entropy", 100, str(tmp_path / "none.json")).name == "packed"
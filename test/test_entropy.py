@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 import stim
 from supercliffords.entropy import (
     sample_stabilisers,
@@ -8,8 +9,12 @@ from supercliffords.entropy import (
     rows,
     gf2_rank,
     compute_entropy,
+    compute_information,
+    compute_region_entropy,
 )
 from supercliffords.gates import ZH
+from supercliffords.circuits import ThreeQuarterCircuit
+from supercliffords.context import MeasurementContext
 
 
 def test_sample_stabilisers():
@@ -85,3 +90,54 @@ def test_compute_entropy():
     sghz.do(c)
     assert compute_entropy(sghz, 1) == 1
     assert compute_entropy(sghz, 2) == 1
+
+
+def test_compute_entropy_subsets():
+    N = 24
+    circuit = ThreeQuarterCircuit(N, 2)
+    ctx = MeasurementContext(N)
+    s = stim.TableauSimulator()
+    for stepcount in range(10):
+        s = circuit.steps.apply(s, stepcount)
+    mat = binary_matrix(sample_stabilisers(s))
+    rng = np.random.default_rng(0)
+    expected = []
+    for _ in range(5):
+        region = np.sort(rng.permutation(N)[:6])
+        cols = np.concatenate([region, N + region])
+        expected.append(gf2_rank(rows(mat[:, cols])) - 6)
+    mean, var = compute_entropy(s, 6, ctx, 5, np.random.default_rng(0))
+    assert mean == np.mean(expected)
+    assert np.isclose(var, np.var(expected, ddof=1))
+    S, S_var, ts = circuit.compute_entropy_subsampled(6, 6, 2, 3, 4)
+    assert S.shape == S_var.shape == ts.shape == (3,)
+    assert S[0] == 0 and S_var[0] == 0
+
+
+def test_compute_information():
+    N = 20
+    circuit = ThreeQuarterCircuit(N, 2)
+    s = stim.TableauSimulator()
+    for stepcount in range(6):
+        s = circuit.steps.apply(s, stepcount)
+    mat = binary_matrix(sample_stabilisers(s))
+
+    def entropy(*regions):
+        region = np.concatenate(regions)
+        return gf2_rank(rows(mat[:, np.concatenate([region, N + region])]))
+
+    A, B, C = np.array([3, 0, 11]), np.arange(12, 17), np.array([5, 19])
+    info = compute_information(s, A, B, C, MeasurementContext(N))
+    for key, regions in [("A", [A]), ("AB", [A, B]), ("BC", [B, C])]:
+        assert info[key] == entropy(*regions) - sum(map(len, regions))
+    assert info["ABC"] == entropy(A, B, C) - 10
+    assert info["I(A:B)"] == info["A"] + info["B"] - info["AB"]
+    assert compute_information(s, A, B)["I(A:B)"] == info["I(A:B)"]
+    assert compute_region_entropy(s, range(7)) == compute_entropy(s, 7)
+    with pytest.raises(ValueError):
+        compute_information(s, A, A)
+
+    values, ts = circuit.compute_observable(
+        4, 1, 2, lambda s, ctx: compute_information(s, A, B, C, ctx)["I3"]
+    )
+    assert values.shape == ts.shape == (4,)
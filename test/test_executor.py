@@ -0,0 +1,32 @@
+import numpy as np
+import stim
+from supercliffords.circuits import ThreeQuarterCircuit
+from supercliffords.executor import (
+    CircuitExecutor,
+    get_executor,
+    shutdown_executor,
+)
+
+
+def test_executor_reused_across_calls():
+    circuit = ThreeQuarterCircuit(16, 2)
+    with CircuitExecutor(2) as executor:
+        for _ in range(2):
+            S, ts = circuit.compute_entropy_parallel(6, 4, 2, 2, 2, executor)
+            assert S.shape == ts.shape == (3,)
+            assert S[0] == 0
+        results = executor.starmap(circuit, "compute_entropy", [(2, 4, 1, 1)])
+        assert len(results) == 1
+
+
+def test_shared_executor():
+    N = 16
+    executor = get_executor(1)
+    assert get_executor(1) is executor
+    op = stim.TableauSimulator()
+    op.do(stim.Circuit(f"I {N - 1}"))
+    f, ts = ThreeQuarterCircuit(N, 2).compute_otoc_parallel(
+        4, 2, 1, op, 1, executor
+    )
+    assert np.allclose(f, 1)
+    shutdown_executor()
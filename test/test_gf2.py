@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+import stim
+from supercliffords import gf2
+from supercliffords.entropy import binary_matrix, convert_signs, gf2_rank, rows
+from supercliffords.otoc import ref_binary
+from supercliffords.gf2 import (
+    pack_bits,
+    unpack_bits,
+    popcount,
+    mask_tail,
+    packed_rank,
+    packed_pivots,
+    packed_ref,
+    packed_to_sets,
+    sparse_rank,
+)
+
+
+def tableau_matrix(N):
+    t = stim.Tableau.random(N)
+    zs = np.array([t.z_output(k) for k in range(N)])
+    signs = np.array([t.z_output(k).sign.real for k in range(N)])
+    return binary_matrix(zs), convert_signs(signs)
+
+
+def test_pack_bits():
+    bits = np.array([[1, 0, 0, 1, 0, 0, 0, 0, 1], [0, 0, 0, 0, 0, 0, 0, 0, 0]])
+    packed = pack_bits(bits)
+    assert packed.shape == (2, 2)
+    assert packed[0, 0] == 9 and packed[0, 1] == 1
+    assert np.array_equal(unpack_bits(packed, 9), bits)
+    assert np.array_equal(popcount(packed), [3, 0])
+    packed[1, 1] = 6
+    mask_tail(packed, 10)
+    assert np.array_equal(popcount(packed), [3, 1])
+
+
+def test_packed_rank():
+    for matrix in ([[5], [10], [15]], [[5], [5], [5]], [[0], [0]]):
+        assert packed_rank(np.array(matrix, dtype=np.uint8)) == gf2_rank(
+            [m[0] for m in matrix]
+        )
+    for n, m in [(3, 6), (10, 4), (17, 40), (40, 17)]:
+        bits = np.random.randint(0, 2, size=(n, m))
+        assert packed_rank(pack_bits(bits), m) == gf2_rank(rows(bits))
+        assert packed_rank(pack_bits(bits), m, block_rows=2) == gf2_rank(
+            rows(bits)
+        )
+
+
+def test_packed_pivots():
+    bits = np.random.randint(0, 2, size=(12, 20))
+    pivots = packed_pivots(pack_bits(bits), 20)
+    for j in range(1, 21):
+        assert np.count_nonzero(pivots < j) == gf2_rank(rows(bits[:, :j]))
+
+
+def test_packed_ref():
+    for N in [3, 8, 13]:
+        A, signs = tableau_matrix(N)
+        W = (N + 7) // 8
+        M = np.concatenate([pack_bits(A[:, :N]), pack_bits(A[:, N:])], 1)
+        blocked = M.copy()
+        packed_signs = signs.astype(np.uint8)
+        blocked_signs = signs.astype(np.uint8)
+        x_rank = packed_ref(M, packed_signs, N)
+        ref, ref_signs = ref_binary(A, signs, N)
+        assert np.array_equal(unpack_bits(M[:, :W], N), ref[:, :N])
+        assert np.array_equal(unpack_bits(M[:, W:], N), ref[:, N:])
+        assert np.array_equal(packed_signs, ref_signs)
+        assert x_rank == gf2_rank(rows(ref[:, :N]))
+        assert packed_ref(blocked, blocked_signs, N, block_rows=2) == x_rank
+        assert np.array_equal(blocked, M)
+        assert np.array_equal(blocked_signs, ref_signs)
+
+
+def test_threaded_elimination(monkeypatch):
+    monkeypatch.setattr(gf2, "PARALLEL_BYTES", 0)
+    for n, m in [(17, 40), (40, 17)]:
+        bits = np.random.randint(0, 2, size=(n, m))
+        assert packed_rank(pack_bits(bits), m, n_threads=3) == gf2_rank(
+            rows(bits)
+        )
+    N = 13
+    A, signs = tableau_matrix(N)
+    M = np.concatenate([pack_bits(A[:, :N]), pack_bits(A[:, N:])], 1)
+    threaded, threaded_signs = M.copy(), signs.astype(np.uint8)
+    packed_signs = signs.astype(np.uint8)
+    x_rank = packed_ref(M, packed_signs, N)
+    assert packed_ref(threaded, threaded_signs, N, 2, n_threads=3) == x_rank
+    assert np.array_equal(threaded, M)
+    assert np.array_equal(threaded_signs, packed_signs)
+
+
+def test_packed_ref_row_sum_error():
+    # X and Z on the same qubit anticommute, so rowsum must fail.
+    M = pack_bits(np.array([[1, 0], [1, 1]]))
+    M = np.concatenate([M & 1, M >> 1], axis=1)
+    with pytest.raises(ValueError):
+        packed_ref(M, np.zeros(2, dtype=np.uint8), 1)
+
+
+def test_packed_to_sets():
+    bits = np.zeros((4, 20), dtype=np.uint8)
+    bits[0, [1, 9]] = 1
+    bits[2, [0, 8, 19]] = 1
+    assert packed_to_sets(pack_bits(bits)) == [{1, 9}, {0, 8, 19}]
+    assert packed_to_sets(pack_bits(np.zeros((2, 3)))) == []
+
+
+def test_sparse_rank():
+    assert sparse_rank([{0, 2}, {1, 3}, {0, 1, 2, 3}]) == 2
+    assert sparse_rank([{0}, {0}, {0}]) == 1
+    assert sparse_rank([]) == 0
+    for n, m in [(5, 5), (20, 12), (12, 30)]:
+        bits = np.random.randint(0, 2, size=(n, m))
+        sets = [set(np.flatnonzero(row)) for row in bits]
+        assert sparse_rank(sets) == gf2_rank(rows(bits))
+    assert sparse_rank([{0, 1, 2}, {0, 3, 4}], max_fill=4) is None
@@ -0,0 +1,36 @@
+import numpy as np
+import stim
+from supercliffords.circuits import AlternatingCircuit, ThreeQuarterCircuit
+from supercliffords.optimize import CLIFFORDS, FusingSimulator
+
+
+def test_single_qubit_cliffords():
+    assert len(CLIFFORDS) == 24
+
+
+def test_fusion():
+    s = FusingSimulator(stim.TableauSimulator(), 4)
+    s.do(stim.Circuit("H 0\nZ 0\nI 3\nH 0\nS 1\nCY 0 1 0 2\nH 0\nH 0"))
+    expected = stim.TableauSimulator()
+    expected.do(stim.Circuit("H 0\nZ 0\nH 0\nS 1\nCY 0 1 0 2\nI 3"))
+    assert s.current_inverse_tableau() == expected.current_inverse_tableau()
+    report = s.report()
+    assert sum(report["in"].values()) == 9
+    # H Z H fuse into one gate, H H cancels and I is dropped.
+    assert report["out"]["CY"] == 2
+    assert sum(report["out"].values()) == 4
+
+
+def test_optimized_circuits():
+    for circuit in (ThreeQuarterCircuit(24, 2), AlternatingCircuit(24, 2)):
+        tableaus = []
+        for optimize in (False, True):
+            circuit.optimize = optimize
+            np.random.seed(4)
+            tableaus.append(
+                [
+                    s.current_inverse_tableau()
+                    for _, _, s in circuit.realisations(12, 3, 2)
+                ]
+            )
+        assert tableaus[0] == tableaus[1]
@@ -0,0 +1,39 @@
+import numpy as np
+import stim
+from supercliffords.circuits import ThreeQuarterCircuit
+from supercliffords.entropy import compute_entropy
+from supercliffords.pipeline import MeasurementPipeline
+
+
+def test_pipeline_matches_serial():
+    N = 24
+    circuit = ThreeQuarterCircuit(N, 2)
+    expected = []
+
+    def measure(snapshot, ctx):
+        return compute_entropy(snapshot, 8, ctx)
+
+    with MeasurementPipeline(measure, N, n_threads=3, max_pending=2) as p:
+        s = stim.TableauSimulator()
+        for stepcount in range(30):
+            s = circuit.steps.apply(s, stepcount)
+            expected.append(compute_entropy(s, 8))
+            p.submit(stepcount, s)
+        results = p.results()
+    assert [key for key, _ in results] == list(range(30))
+    assert [value for _, value in results] == expected
+
+
+def test_compute_entropy_pipelined():
+    N = 16
+    circuit = ThreeQuarterCircuit(N, 2)
+    S, ts = circuit.compute_entropy_pipelined(12, 4, 3, 2, n_threads=2)
+    assert np.allclose(ts, [0, 3, 6, 9])
+    assert S[0] == 0
+    assert np.all((S >= 0) & (S <= 4))
+
+    op = stim.TableauSimulator()
+    op.do(stim.Circuit(f"I {N - 1}"))
+    f, ts = circuit.compute_otoc_pipelined(6, 1, 2, op, n_threads=2)
+    assert len(f) == 6
+    assert f[0] == 1
@@ -0,0 +1,50 @@
+import numpy as np
+import stim
+from supercliffords.circuits import ThreeQuarterCircuit
+from supercliffords.entropy import compute_entropy
+from supercliffords.snapshots import Snapshot, SnapshotLibrary
+
+
+def test_save_and_load(tmp_path):
+    np.random.seed(3)
+    s = stim.TableauSimulator()
+    s.do(stim.Circuit("H 0\nCNOT 0 1\nS 2\nI 9"))
+    snapshot = Snapshot.capture(s, 4, {"slow": 2})
+    path = str(tmp_path / "snap.npz")
+    snapshot.save(path)
+    loaded = Snapshot.load(path)
+    assert loaded.tableau == s.current_inverse_tableau()
+    assert loaded.stepcount == 4 and loaded.meta == {"slow": 2}
+    assert loaded.N == 10
+    expected = np.random.rand()
+    restored = loaded.restore()
+    assert np.random.rand() == expected
+    assert restored.current_inverse_tableau() == s.current_inverse_tableau()
+
+
+def test_resume_reproduces_run(tmp_path):
+    N = 16
+    circuit = ThreeQuarterCircuit(N, 2)
+    library = SnapshotLibrary(str(tmp_path / "lib"))
+    np.random.seed(5)
+    full = [
+        (r, stepcount, compute_entropy(s, 4))
+        for r, stepcount, s in circuit.realisations(20, 1, 2, library, [9])
+    ]
+    assert library.index() == [(0, 9), (1, 9)]
+    np.random.seed(6)
+    resumed = [
+        (r, stepcount, compute_entropy(s, 4))
+        for r, stepcount, s in circuit.realisations(
+            20, 1, 2, library, resume=True
+        )
+    ]
+    assert resumed == [x for x in full if x[1] > 9]
+
+    S, ts = circuit.compute_entropy(
+        20, 4, 5, 2, snapshots=library, resume=True
+    )
+    assert np.all(np.isnan(S[:2])) and not np.any(np.isnan(S[2:]))
+
+    values, ts = library.evaluate(lambda tableau, ctx: len(tableau))
+    assert np.array_equal(ts, [9]) and np.array_equal(values, [[N], [N]])
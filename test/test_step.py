@@ -2,6 +2,11 @@ import numpy as np
 import pytest
 import stim
 from supercliffords.steps import Step, IdStep, Initialize
+from supercliffords.circuits import (
+    AlternatingCircuit,
+    FloquetCircuit,
+    ThreeQuarterCircuit,
+)
 
 
 class StepT(Step):
@@ -67,3 +72,38 @@ def test_Initialize():
 
     with pytest.raises(Exception):
         step = Initialize(3, "IXY")
+
+
+def test_Initialize_frame():
+    assert Initialize(4, "XYXY").frame() == stim.PauliString("_X_X")
+    N = 16
+    op_strings = ["X" * N, "Y" * N, "XY" * (N // 2)]
+    base = ThreeQuarterCircuit(N, 2, "YX" * (N // 2))
+    np.random.seed(11)
+    s = stim.TableauSimulator()
+    for stepcount in range(8):
+        s = base.steps.apply(s, stepcount)
+    branches = base.op_string_branches(s, op_strings)
+    for op_string, branch in zip(op_strings, branches):
+        circuit = ThreeQuarterCircuit(N, 2, op_string)
+        np.random.seed(11)
+        expected = stim.TableauSimulator()
+        for stepcount in range(8):
+            expected = circuit.steps.apply(expected, stepcount)
+        assert (
+            branch.current_inverse_tableau()
+            == expected.current_inverse_tableau()
+        )
+
+
+def test_FloquetStep():
+    N = 24
+    circuit = FloquetCircuit(AlternatingCircuit(N, 2), period=2)
+    S, ts = circuit.compute_entropy(12, 6, 1, 2, seed=4)
+    S_at, _ = circuit.compute_entropy_at(ts.astype(int), 6, 2, seed=4)
+    assert np.array_equal(S, S_at)
+    first = circuit.floquet.layers
+    circuit.steps.apply(stim.TableauSimulator(), 0)
+    assert circuit.floquet.layers != first
+    step = circuit.floquet
+    assert step.evolution(4) == step.evolution(2).then(step.period_tableau())
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pytest
+from supercliffords.store import (
+    ResultStore,
+    choose_dtype,
+    read_legacy,
+    convert_legacy,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+
+
+def test_choose_dtype():
+    assert choose_dtype("entropy") == "int16"
+    assert choose_dtype("entropy", np.array([0.0, 3.0, 60.0])) == "int16"
+    assert choose_dtype("entropy", np.array([0.5, 3.0])) == "float32"
+    assert choose_dtype("otoc", np.array([1.0, 0.5])) == "float32"
+
+
+def test_append_and_read(tmp_path):
+    store = ResultStore(str(tmp_path))
+    dataset = store.create("run/N12", 5, "entropy", 12, slow=2, cut=3)
+    rows = np.arange(35).reshape(7, 5) % 4
+    dataset.append(rows[:3], seeds=[1, 2, 3])
+    dataset.append(rows[3:])
+
+    reopened = store.open("run/N12")
+    assert store.names() == ["run/N12"]
+    assert len(reopened) == 7
+    assert reopened.dtype == np.int16
+    assert reopened.meta["N"] == 12 and reopened.meta["cut"] == 3
+    assert reopened.seeds == [1, 2, 3, None, None, None, None]
+    assert np.array_equal(reopened.array(), rows)
+    assert np.array_equal(reopened[4], rows[4])
+    assert np.allclose(reopened.mean(), rows.mean(axis=0))
+
+    with pytest.raises(ValueError):
+        reopened.append(np.zeros((1, 4)))
+    with pytest.raises(ValueError):
+        reopened.append(np.full((1, 5), 0.5))
+    with pytest.raises(FileExistsError):
+        store.create("run/N12", 5, "entropy", 12)
+
+
+def test_chunking(tmp_path):
+    store = ResultStore(str(tmp_path))
+    dataset = store.create("otoc", 3, "otoc", 6, chunk_rows=2)
+    rows = np.random.rand(5, 3)
+    dataset.append(rows)
+    assert len(dataset.meta["chunks"]) == 3
+    assert dataset.dtype == np.float32
+    assert np.allclose(dataset.array(), rows, atol=1e-6)
+
+
+def test_convert_legacy(tmp_path):
+    path = os.path.join(DATA_DIR, "appendix_data", "N240.csv")
+    data, meta = read_legacy(path)
+    assert data.shape == (100, 200)
+    assert meta["N"] == 240 and meta["cut"] == 60
+
+    legacy = tmp_path / "legacy" / "appendix_data"
+    legacy.mkdir(parents=True)
+    (legacy / "N240.csv").write_bytes(open(path, "rb").read())
+    store = ResultStore(str(tmp_path / "store"))
+    assert convert_legacy(str(tmp_path / "legacy"), store) == [
+        "appendix_data/N240"
+    ]
+    dataset = store.open("appendix_data/N240")
+    assert dataset.dtype == np.int16
+    assert np.array_equal(dataset.array(), data)
+    assert convert_legacy(str(tmp_path / "legacy"), store) == []
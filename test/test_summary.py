@@ -0,0 +1,41 @@
+import numpy as np
+from supercliffords.store import ResultStore
+from supercliffords.summary import SummaryIndex, build_summary, summarise
+
+
+def test_summarise():
+    data = np.array([[0.0, 1.0, 2.0], [2.0, 3.0, 4.0]])
+    curves = summarise(data, {}, quantiles=(0.5,))
+    assert np.allclose(curves["mean"], [1.0, 2.0, 3.0])
+    assert np.allclose(curves["sem"], [1.0, 1.0, 1.0])
+    assert np.allclose(curves["quantiles"], [[1.0, 2.0, 3.0]])
+
+    curves = summarise(data[:1], {"aggregate": "mean"})
+    assert np.all(np.isnan(curves["sem"]))
+
+
+def test_build_and_query(tmp_path):
+    store = ResultStore(str(tmp_path / "store"))
+    a = store.create("a", 4, "entropy", 8, slow=2, cut=2)
+    a.append(np.array([[0, 1, 2, 2], [0, 1, 1, 2]]))
+    b = store.create("b", 4, "otoc", 8, slow=2)
+    b.append(np.array([[1.0, 0.5, 0.5, 0.25]]))
+
+    path = str(tmp_path / "index.npz")
+    index = build_summary([store.root], path)
+    assert index.names() == ["a", "b"]
+
+    loaded = SummaryIndex.load(path)
+    assert list(loaded.query(kind="entropy", N=8, cut=2)) == ["a"]
+    assert list(loaded.query(slow=2)) == ["a", "b"]
+    assert loaded.query(N=9) == {}
+    assert np.allclose(loaded.curve("a"), [0.0, 1.0, 1.5, 2.0])
+    assert np.allclose(loaded.curve("a", "quantile", 0.5), [0, 1, 1.5, 2])
+    assert loaded.stale([store.root]) == []
+
+    a.append(np.array([[0, 2, 2, 2]]))
+    assert loaded.stale([store.root]) == ["a"]
+    refreshed = build_summary([store.root], path)
+    assert refreshed["b"]["hash"] == loaded["b"]["hash"]
+    assert np.allclose(refreshed.curve("a")[1], 4 / 3)
+    assert refreshed.stale([store.root]) == []